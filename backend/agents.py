@@ -1,45 +1,92 @@
-import ollama
+import llm_client
 from config import Config
+from jd_cache import JobAnalysisCache
+from prompt_budget import PromptBudget
+from prompts import build_messages, messages_text
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 import json
 
+if TYPE_CHECKING:
+    import ollama
+
 class JobAnalyzerAgent:
     def __init__(self):
         self.model = Config.LLM_MODEL
 
-    def analyze_job_description(self, job_description: str) -> dict:
+    def analyze_job_description(self, job_description: str,
+                                jd_cache: Optional[JobAnalysisCache] = None) -> dict:
         """
         Analyzes a job description to extract key skills and responsibilities.
+        If a JD cache is given, a previous analysis of the same posting is reused.
+        """
+        if jd_cache is not None:
+            cached = jd_cache.get(job_description, 'analysis')
+            if cached is not None:
+                print("Agent 1: Using cached job description analysis.")
+                return cached
+        
+        result = self._analyze(job_description)
+        if jd_cache is not None and (result.get("skills") or result.get("responsibilities")):
+            jd_cache.put(job_description, 'analysis', result)
+        return result
+
+    async def analyze_job_description_async(self, job_description: str, client: "ollama.AsyncClient",
+                                            jd_cache: Optional[JobAnalysisCache] = None) -> dict:
         """
+        Async variant of analyze_job_description using Ollama's async client.
+        """
+        if jd_cache is not None:
+            cached = jd_cache.get(job_description, 'analysis')
+            if cached is not None:
+                print("Agent 1: Using cached job description analysis.")
+                return cached
+        
         print("Agent 1: Analyzing job description...")
-        prompt = f"""You are an expert HR analyst. Analyze this job description and extract the 5 most critical skills and the top 3 responsibilities. Output this as a structured JSON object with two keys: 'skills' (a list of strings) and 'responsibilities' (a list of strings).
+        messages, budget = self._prepare_prompt(job_description)
+        try:
+            response = await llm_client.chat_async(
+                client, self.model, "job_analysis", messages, budget.options(0.3)
+            )
+            result = self._parse_response(response['message']['content'])
+        except Exception as e:
+            print(f"Error in JobAnalyzerAgent: {e}")
+            return {"skills": [], "responsibilities": []}
+        if jd_cache is not None and (result.get("skills") or result.get("responsibilities")):
+            jd_cache.put(job_description, 'analysis', result)
+        return result
 
-        JOB DESCRIPTION:
-        ---
-        {job_description}
-        ---
+    def _build_prompt(self) -> str:
+        return """TASK: Analyze the job description above and extract the 5 most critical skills and the top 3 responsibilities. Output this as a structured JSON object with two keys: 'skills' (a list of strings) and 'responsibilities' (a list of strings).
 
         Output JSON:
         """
-        
+
+    def _prepare_prompt(self, job_description: str) -> Tuple[List[Dict], PromptBudget]:
+        """Messages for the analysis call; the job description is part of the shared prompt prefix."""
+        return build_messages(job_description, self._build_prompt()), PromptBudget("job_analysis")
+
+    def _parse_response(self, content: str) -> dict:
+        # Attempt to parse JSON. Sometimes LLMs might add conversational text.
+        json_start = content.find('{')
+        json_end = content.rfind('}') + 1
+        if json_start != -1 and json_end != -1:
+            try:
+                return json.loads(content[json_start:json_end])
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON from Job Analyzer: {e}\nRaw content: {content}")
+                return {"skills": [], "responsibilities": []}
+        print(f"Warning: Could not find valid JSON in response: {content}")
+        return {"skills": [], "responsibilities": []}
+
+    def _analyze(self, job_description: str) -> dict:
+        print("Agent 1: Analyzing job description...")
+        messages, budget = self._prepare_prompt(job_description)
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.3} # Keep output more consistent
+            response = llm_client.chat(
+                self.model, "job_analysis", messages,
+                budget.options(0.3) # Keep output more consistent
             )
-            content = response['message']['content']
-            # Attempt to parse JSON. Sometimes LLMs might add conversational text.
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end != -1:
-                json_str = content[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                print(f"Warning: Could not find valid JSON in response: {content}")
-                return {"skills": [], "responsibilities": []}
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Job Analyzer: {e}\nRaw content: {content}")
-            return {"skills": [], "responsibilities": []}
+            return self._parse_response(response['message']['content'])
         except Exception as e:
             print(f"Error in JobAnalyzerAgent: {e}")
             return {"skills": [], "responsibilities": []}
@@ -49,21 +96,15 @@ class ContentSynthesizerAgent:
     def __init__(self):
         self.model = Config.LLM_MODEL
 
-    def generate_tailored_content(self, job_description: str, relevant_experiences: list[str]) -> str:
-        """
-        Generates tailored resume content based on the job description and relevant experiences.
-        """
-        print("Agent 2: Synthesizing and generating tailored content...")
-        
-        retrieved_docs_str = "\n".join([f"- {exp}" for exp in relevant_experiences])
+    @staticmethod
+    def _format_experience(experience: str) -> str:
+        return f"- {experience}\n"
 
-        prompt = f"""
-        You are a professional resume writer. Your task is to tailor resume sections for the following job description, leveraging the provided relevant experiences.
+    def _build_prompt(self, relevant_experiences: list[str]) -> str:
+        retrieved_docs_str = "".join(self._format_experience(exp) for exp in relevant_experiences).rstrip("\n")
 
-        **JOB DESCRIPTION:**
-        ---
-        {job_description}
-        ---
+        return f"""
+        TASK: Tailor resume sections for the job description above, leveraging the provided relevant experiences.
 
         Here are the most relevant experiences from the candidate's master resume:
         **RELEVANT EXPERIENCES:**
@@ -78,14 +119,69 @@ class ContentSynthesizerAgent:
 
         Output the complete, tailored resume sections, clearly labeled (e.g., "Professional Summary", "Experience", "Skills").
         """
+
+    def _prepare_prompt(self, job_description: str,
+                        relevant_experiences: list[str]) -> Tuple[List[Dict], PromptBudget]:
+        """
+        Messages for the synthesis call within the context budget. The job description
+        sits in the shared prefix; experiences fill what is left and are dropped
+        lowest-ranked first, each one kept as a single chunk.
+        """
+        budget = PromptBudget("synthesis")
+        experiences = budget.fit_items(
+            messages_text(build_messages(job_description, self._build_prompt([]))),
+            relevant_experiences, render=self._format_experience
+        )
+        return build_messages(job_description, self._build_prompt(experiences)), budget
+
+    def generate_tailored_content(self, job_description: str, relevant_experiences: list[str]) -> str:
+        """
+        Generates tailored resume content based on the job description and relevant experiences.
+        """
+        print("Agent 2: Synthesizing and generating tailored content...")
+        messages, budget = self._prepare_prompt(job_description, relevant_experiences)
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.7} # Allow for more creative generation
+            response = llm_client.chat(
+                self.model, "synthesis", messages,
+                budget.options(0.7) # Allow for more creative generation
             )
             return response['message']['content']
         except Exception as e:
             print(f"Error in ContentSynthesizerAgent: {e}")
             return "An error occurred during content generation."
+
+    async def generate_tailored_content_async(self, job_description: str, relevant_experiences: list[str],
+                                              client: "ollama.AsyncClient") -> str:
+        """
+        Async variant of generate_tailored_content using Ollama's async client.
+        """
+        print("Agent 2: Synthesizing and generating tailored content...")
+        messages, budget = self._prepare_prompt(job_description, relevant_experiences)
+        try:
+            response = await llm_client.chat_async(
+                client, self.model, "synthesis", messages, budget.options(0.7)
+            )
+            return response['message']['content']
+        except Exception as e:
+            print(f"Error in ContentSynthesizerAgent: {e}")
+            return "An error occurred during content generation."
+
+    def stream_tailored_content(self, job_description: str, relevant_experiences: list[str]) -> Iterator[str]:
+        """
+        Same as generate_tailored_content, but yields text fragments as the model produces them.
+        """
+        print("Agent 2: Streaming tailored content...")
+        messages, budget = self._prepare_prompt(job_description, relevant_experiences)
+        
+        produced = False
+        try:
+            for part in llm_client.chat_stream(self.model, "synthesis", messages, budget.options(0.7)):
+                token = part['message']['content']
+                if token:
+                    produced = True
+                    yield token
+        except Exception as e:
+            print(f"Error in ContentSynthesizerAgent: {e}")
+            if not produced:
+                yield "An error occurred during content generation."
@@ -1,42 +1,154 @@
-import ollama
 import re
-from typing import Dict, List, Tuple
+import llm_client
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from config import Config
+from jd_cache import JobAnalysisCache
+from lexicon import STOPWORDS, get_lexicon, tokenize
+from metrics import in_context
+from prompt_budget import PromptBudget, Section
+from prompts import build_messages, messages_text
 import json
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# JSON schemas passed as Ollama's `format` so extraction output is always parseable
+TERMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "skills": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["keywords", "skills"]
+}
+
+PAIRED_TERMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "job": TERMS_SCHEMA,
+        "resume": TERMS_SCHEMA
+    },
+    "required": ["job", "resume"]
+}
+
+class TermMatch(NamedTuple):
+    job_terms: List[str]   # unique job terms, in order
+    matched: List[str]     # job terms found in the resume
+    missing: List[str]     # job terms not found in the resume
+    extra: List[str]       # resume terms that matched no job term
 
 class ATSScorer:
-    def __init__(self):
+    def __init__(self, max_parallel: int = Config.OLLAMA_MAX_PARALLEL,
+                 embed_texts: Optional[Callable[[List[str]], List[Optional[List[float]]]]] = None):
         self.model = Config.LLM_MODEL
-        
-    def calculate_ats_score(self, job_description: str, tailored_resume: str) -> Dict:
+        # Embedding function (normally ResumeProcessor.embed_texts) used for semantic term matching
+        self.embed_texts = embed_texts
+        # Shared pool for the scoring calls; llm_client's slots cap in-flight LLM calls process-wide
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="ats")
+
+    def calculate_ats_score(self, job_description: str, tailored_resume: str,
+                            jd_cache: Optional[JobAnalysisCache] = None) -> Dict:
         """
         Calculate ATS score by analyzing multiple factors:
         1. Keyword matching
         2. Skill alignment
         3. Experience relevance
         4. Format compliance
+        
+        If a JD cache is given, the job description's keywords and skills are
+        extracted at most once per posting.
+        """
+        for name, value in self.iter_ats_score(job_description, tailored_resume, jd_cache):
+            if name == "ats_score":
+                return value
+    
+    def iter_ats_score(self, job_description: str, tailored_resume: str,
+                       jd_cache: Optional[JobAnalysisCache] = None) -> Iterator[Tuple[str, object]]:
+        """
+        Yields (name, value) pairs for each sub-score as soon as it is available
+        (format_score, experience_score, keyword_score, skill_score, overall_score),
+        followed by ("ats_score", <full result dict>).
         """
         print("ATS Scorer: Analyzing resume against job description...")
         
-        # Extract keywords and skills from job description
-        job_keywords = self._extract_keywords(job_description)
-        job_skills = self._extract_skills(job_description)
+        # The extraction and experience calls are independent of each other, so run them concurrently.
+        # Extraction fans out onto the shared pool itself, so it is coordinated from a separate thread.
+        # Work is submitted in_context so its spans reach the caller's request trace.
+        experience_future = self.executor.submit(in_context(self._calculate_experience_relevance), job_description, tailored_resume)
+        with ThreadPoolExecutor(max_workers=1) as coordinator:
+            terms_future = coordinator.submit(
+                in_context(self._extract_job_and_resume_terms), job_description, tailored_resume, jd_cache
+            )
+            
+            format_score = self._calculate_format_score(tailored_resume)
+            yield "format_score", format_score
+            
+            for future in as_completed([experience_future, terms_future]):
+                if future is experience_future:
+                    experience_score = experience_future.result()
+                    yield "experience_score", experience_score
+                    continue
+                
+                job_keywords, job_skills, resume_keywords, resume_skills = terms_future.result()
+                # Detailed analysis only needs the keyword lists, so start it as soon as they are ready
+                analysis_future = self.executor.submit(
+                    in_context(self._generate_detailed_analysis), job_description, tailored_resume, job_keywords, resume_keywords
+                )
+                keyword_match, skill_match = self._match_term_lists(
+                    [(job_keywords, resume_keywords), (job_skills, resume_skills)]
+                )
+                keyword_score = self._calculate_keyword_score(keyword_match)
+                yield "keyword_score", keyword_score
+                skill_score = self._calculate_skill_score(skill_match)
+                yield "skill_score", skill_score
         
-        # Extract keywords and skills from tailored resume
-        resume_keywords = self._extract_keywords(tailored_resume)
-        resume_skills = self._extract_skills(tailored_resume)
+        # Calculate weighted overall score
+        overall_score = self._calculate_overall_score(keyword_score, skill_score, experience_score, format_score)
+        yield "overall_score", overall_score
         
-        # Calculate various scores
-        keyword_score = self._calculate_keyword_score(job_keywords, resume_keywords)
-        skill_score = self._calculate_skill_score(job_skills, resume_skills)
-        experience_score = self._calculate_experience_relevance(job_description, tailored_resume)
-        format_score = self._calculate_format_score(tailored_resume)
+        analysis = analysis_future.result()
         
-        # Calculate weighted overall score
+        yield "ats_score", {
+            "overall_score": overall_score,
+            "keyword_score": keyword_score,
+            "skill_score": skill_score,
+            "experience_score": experience_score,
+            "format_score": format_score,
+            "missing_keywords": keyword_match.missing,
+            "missing_skills": skill_match.missing,
+            "analysis": analysis,
+            "recommendations": self._generate_recommendations(keyword_match.missing, overall_score)
+        }
+    
+    def calculate_fast_ats_score(self, job_description: str, tailored_resume: str) -> Dict:
+        """
+        Deterministic, LLM-free ATS score built on the compiled skill/keyword lexicon.
+        Returns the same fields as calculate_ats_score in milliseconds, for live
+        as-you-type scoring and bulk triage.
+        """
+        lexicon = get_lexicon()
+        job_terms = lexicon.scan(job_description)
+        resume_terms = lexicon.scan(tailored_resume)
+        
+        job_skills = list(job_terms["skills"])
+        resume_skills = list(resume_terms["skills"])
+        job_keywords = [term for term, _ in (job_terms["keywords"] + job_terms["skills"]).most_common()]
+        resume_keywords = [term for term, _ in (resume_terms["keywords"] + resume_terms["skills"]).most_common()]
+        
+        # Lexicon terms are already canonicalized, so exact matching is sufficient here
+        keyword_match = self._match_terms(job_keywords, resume_keywords, semantic=False)
+        skill_match = self._match_terms(job_skills, resume_skills, semantic=False)
+        keyword_score = self._calculate_keyword_score(keyword_match)
+        skill_score = self._calculate_skill_score(skill_match)
+        experience_score = self._calculate_lexical_relevance(job_description, tailored_resume)
+        format_score = self._calculate_format_score(tailored_resume)
         overall_score = self._calculate_overall_score(keyword_score, skill_score, experience_score, format_score)
         
-        # Generate detailed analysis
-        analysis = self._generate_detailed_analysis(job_description, tailored_resume, job_keywords, resume_keywords)
+        analysis = (
+            f"Fast lexicon scan: the resume covers {len(keyword_match.matched)} of {len(job_keywords)} job keywords "
+            f"and {len(skill_match.matched)} of {len(job_skills)} required skills. "
+            f"Run a full analysis for a detailed review."
+        )
         
         return {
             "overall_score": overall_score,
@@ -44,35 +156,207 @@ class ATSScorer:
             "skill_score": skill_score,
             "experience_score": experience_score,
             "format_score": format_score,
-            "missing_keywords": self._find_missing_keywords(job_keywords, resume_keywords),
-            "missing_skills": self._find_missing_skills(job_skills, resume_skills),
+            "missing_keywords": keyword_match.missing,
+            "missing_skills": skill_match.missing,
             "analysis": analysis,
-            "recommendations": self._generate_recommendations(job_keywords, resume_keywords, overall_score)
+            "recommendations": self._generate_recommendations(keyword_match.missing, overall_score)
         }
     
-    def _extract_keywords(self, text: str) -> List[str]:
+    def _calculate_lexical_relevance(self, job_description: str, tailored_resume: str) -> float:
         """
-        Extract important keywords from text using AI.
+        Cosine similarity of content-word frequencies, used as the LLM-free experience score (0-100).
         """
-        prompt = f"""
-        Extract the 15 most important keywords from this text. Focus on:
-        - Technical terms
-        - Industry-specific terminology
-        - Tools and technologies
-        - Action verbs
-        - Qualifications and requirements
+        job_counts = Counter(token for token in tokenize(job_description)
+                             if len(token) > 2 and token not in STOPWORDS)
+        resume_counts = Counter(token for token in tokenize(tailored_resume)
+                                if len(token) > 2 and token not in STOPWORDS)
+        if not job_counts or not resume_counts:
+            return 0.0
+        dot = sum(count * resume_counts[token] for token, count in job_counts.items())
+        norm = math.sqrt(sum(c * c for c in job_counts.values())) * math.sqrt(sum(c * c for c in resume_counts.values()))
+        return round(min(dot / norm * 100, 100.0), 1)
+    
+    def _extract_job_and_resume_terms(self, job_description: str, tailored_resume: str,
+                                      jd_cache: Optional[JobAnalysisCache] = None
+                                      ) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """
+        Extract (job_keywords, job_skills, resume_keywords, resume_skills) using the
+        configured extraction mode, running independent calls concurrently. Every
+        LLM call goes through the shared pool (this method only waits on them), so
+        one scoring run never holds more than OLLAMA_MAX_PARALLEL threads.
+        """
+        cached_job_terms = jd_cache.get(job_description, 'terms') if jd_cache is not None else None
+        mode = Config.ATS_EXTRACTION_MODE
+        if cached_job_terms is not None:
+            job_keywords, job_skills = cached_job_terms
+            if mode == "separate":
+                resume_keywords_future = self.executor.submit(in_context(self._extract_keywords), tailored_resume, job_description)
+                resume_skills_future = self.executor.submit(in_context(self._extract_skills), tailored_resume, job_description)
+                resume_keywords, resume_skills = resume_keywords_future.result(), resume_skills_future.result()
+            else:
+                resume_keywords, resume_skills = self.executor.submit(
+                    in_context(self._extract_terms), tailored_resume, job_description
+                ).result()
+            return job_keywords, job_skills, resume_keywords, resume_skills
+        
+        if mode == "paired":
+            (job_keywords, job_skills), (resume_keywords, resume_skills) = self.executor.submit(
+                in_context(self._extract_terms_pair), job_description, tailored_resume
+            ).result()
+        elif mode == "separate":
+            job_keywords_future = self.executor.submit(in_context(self._extract_keywords), job_description, job_description)
+            resume_keywords_future = self.executor.submit(in_context(self._extract_keywords), tailored_resume, job_description)
+            job_skills_future = self.executor.submit(in_context(self._extract_skills), job_description, job_description)
+            resume_skills_future = self.executor.submit(in_context(self._extract_skills), tailored_resume, job_description)
+            job_keywords = job_keywords_future.result()
+            resume_keywords = resume_keywords_future.result()
+            job_skills = job_skills_future.result()
+            resume_skills = resume_skills_future.result()
+        else:
+            job_terms_future = self.executor.submit(in_context(self._extract_terms), job_description, job_description)
+            resume_terms_future = self.executor.submit(in_context(self._extract_terms), tailored_resume, job_description)
+            job_keywords, job_skills = job_terms_future.result()
+            resume_keywords, resume_skills = resume_terms_future.result()
+        
+        if jd_cache is not None and (job_keywords or job_skills):
+            jd_cache.put(job_description, 'terms', (job_keywords, job_skills))
+        return job_keywords, job_skills, resume_keywords, resume_skills
+
+    def prefetch_job_terms(self, job_description: str, jd_cache: JobAnalysisCache) -> bool:
+        """
+        Extracts the job description's keywords and skills into the JD cache before
+        there is a resume to score, so a later calculate_ats_score only extracts the
+        resume's. Returns whether the terms are cached; "paired" mode extracts both
+        texts in one call and cannot be split.
+        """
+        if jd_cache.get(job_description, 'terms') is not None:
+            return True
+        mode = Config.ATS_EXTRACTION_MODE
+        if mode == "paired":
+            return False
+        try:
+            if mode == "separate":
+                keywords_future = self.executor.submit(in_context(self._extract_keywords), job_description, job_description)
+                skills_future = self.executor.submit(in_context(self._extract_skills), job_description, job_description)
+                job_keywords, job_skills = keywords_future.result(), skills_future.result()
+            else:
+                job_keywords, job_skills = self.executor.submit(
+                    in_context(self._extract_terms), job_description, job_description
+                ).result()
+        except Exception as e:
+            print(f"Error prefetching job description terms: {e}")
+            return False
+        if not (job_keywords or job_skills):
+            return False
+        jd_cache.put(job_description, 'terms', (job_keywords, job_skills))
+        return True
+
+    def _prepare_messages(self, task: str, job_description: str, build_prompt: Callable[..., str],
+                          **sections: Section) -> Tuple[List[Dict], PromptBudget]:
+        """
+        Builds chat messages for one scoring call: the shared system prompt and job
+        description prefix, then the task suffix rendered with its sections fitted
+        to the task's token budget.
+        """
+        budget = PromptBudget(task)
+        template = messages_text(build_messages(job_description, build_prompt(**{name: "" for name in sections})))
+        fitted = budget.fit(template, **sections)
+        return build_messages(job_description, build_prompt(**fitted)), budget
+    
+    @staticmethod
+    def _resume_block(text: str) -> str:
+        return f"RESUME:\n---\n{text}\n---\n\n" if text else ""
+    
+    @staticmethod
+    def _normalize_terms(terms) -> List[str]:
+        if not isinstance(terms, list):
+            return []
+        return [term.lower().strip() for term in terms if isinstance(term, str) and term.strip()]
+    
+    def _extract_terms(self, text: str, job_description: str) -> Tuple[List[str], List[str]]:
+        """
+        Extract keywords and skills from one text (the job description itself, or a
+        resume) in a single schema-constrained call.
+        """
+        if text == job_description:
+            messages, budget = self._prepare_messages("term_extraction", job_description, self._build_terms_prompt)
+        else:
+            messages, budget = self._prepare_messages(
+                "term_extraction", job_description, self._build_terms_prompt,
+                text=Section(text, query=job_description)
+            )
         
-        Text: {text}
+        try:
+            response = llm_client.chat(
+                self.model, "term_extraction", messages, budget.options(0.1), format=TERMS_SCHEMA
+            )
+            result = json.loads(response['message']['content'])
+            return self._normalize_terms(result.get('keywords')), self._normalize_terms(result.get('skills'))
+        except Exception as e:
+            print(f"Error extracting keywords and skills: {e}")
+            return self._fallback_keyword_extraction(text), self._fallback_skill_extraction(text)
+    
+    def _build_terms_prompt(self, text: str = "") -> str:
+        return f"""
+        {self._resume_block(text)}TASK: From the {"resume" if text else "job description"} above, extract:
+        - "keywords": the 15 most important keywords (technical terms, industry terminology,
+          tools and technologies, action verbs, qualifications and requirements)
+        - "skills": specific technical and soft skills (programming languages, frameworks and
+          tools, soft skills, certifications, methodologies)
         
-        Return only the keywords as a JSON array of strings, no explanations.
+        Return only a JSON object with the keys "keywords" and "skills", each a JSON array of strings.
+        """
+    
+    def _extract_terms_pair(self, job_description: str,
+                            tailored_resume: str) -> Tuple[Tuple[List[str], List[str]], Tuple[List[str], List[str]]]:
         """
+        Extract keywords and skills from both the job description and the resume in one call.
+        """
+        messages, budget = self._prepare_messages(
+            "term_extraction", job_description, self._build_terms_pair_prompt,
+            tailored_resume=Section(tailored_resume, query=job_description)
+        )
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.1}
+            response = llm_client.chat(
+                self.model, "term_extraction", messages, budget.options(0.1), format=PAIRED_TERMS_SCHEMA
             )
+            result = json.loads(response['message']['content'])
+            job, resume = result.get('job') or {}, result.get('resume') or {}
+            return (
+                (self._normalize_terms(job.get('keywords')), self._normalize_terms(job.get('skills'))),
+                (self._normalize_terms(resume.get('keywords')), self._normalize_terms(resume.get('skills')))
+            )
+        except Exception as e:
+            print(f"Error extracting paired keywords and skills: {e}")
+            return (
+                (self._fallback_keyword_extraction(job_description), self._fallback_skill_extraction(job_description)),
+                (self._fallback_keyword_extraction(tailored_resume), self._fallback_skill_extraction(tailored_resume))
+            )
+    
+    def _build_terms_pair_prompt(self, tailored_resume: str) -> str:
+        return f"""
+        {self._resume_block(tailored_resume)}TASK: For each of the two texts above (the job description and the resume), extract:
+        - "keywords": the 15 most important keywords (technical terms, industry terminology,
+          tools and technologies, action verbs, qualifications and requirements)
+        - "skills": specific technical and soft skills (programming languages, frameworks and
+          tools, soft skills, certifications, methodologies)
+        
+        Return only a JSON object with the keys "job" and "resume", each an object with
+        the keys "keywords" and "skills" holding JSON arrays of strings.
+        """
+    
+    def _extract_keywords(self, text: str, job_description: str) -> List[str]:
+        """
+        Extract important keywords from text (the job description itself, or a resume) using AI.
+        """
+        sections = {} if text == job_description else {"text": Section(text, query=job_description)}
+        messages, budget = self._prepare_messages(
+            "list_extraction", job_description, self._build_keywords_prompt, **sections
+        )
+        
+        try:
+            response = llm_client.chat(self.model, "list_extraction", messages, budget.options(0.1))
             content = response['message']['content']
             
             # Try to parse JSON
@@ -89,29 +373,29 @@ class ATSScorer:
             print(f"Error extracting keywords: {e}")
             return self._fallback_keyword_extraction(text)
     
-    def _extract_skills(self, text: str) -> List[str]:
+    def _build_keywords_prompt(self, text: str = "") -> str:
+        return f"""
+        {self._resume_block(text)}TASK: Extract the 15 most important keywords from the {"resume" if text else "job description"} above. Focus on:
+        - Technical terms
+        - Industry-specific terminology
+        - Tools and technologies
+        - Action verbs
+        - Qualifications and requirements
+        
+        Return only the keywords as a JSON array of strings, no explanations.
         """
-        Extract specific skills from text.
+    
+    def _extract_skills(self, text: str, job_description: str) -> List[str]:
         """
-        prompt = f"""
-        Extract specific technical and soft skills from this text. Focus on:
-        - Programming languages
-        - Frameworks and tools
-        - Soft skills
-        - Certifications
-        - Methodologies
-        
-        Text: {text}
-        
-        Return only the skills as a JSON array of strings, no explanations.
+        Extract specific skills from text (the job description itself, or a resume).
         """
+        sections = {} if text == job_description else {"text": Section(text, query=job_description)}
+        messages, budget = self._prepare_messages(
+            "list_extraction", job_description, self._build_skills_prompt, **sections
+        )
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.1}
-            )
+            response = llm_client.chat(self.model, "list_extraction", messages, budget.options(0.1))
             content = response['message']['content']
             
             json_start = content.find('[')
@@ -126,6 +410,18 @@ class ATSScorer:
             print(f"Error extracting skills: {e}")
             return self._fallback_skill_extraction(text)
     
+    def _build_skills_prompt(self, text: str = "") -> str:
+        return f"""
+        {self._resume_block(text)}TASK: Extract specific technical and soft skills from the {"resume" if text else "job description"} above. Focus on:
+        - Programming languages
+        - Frameworks and tools
+        - Soft skills
+        - Certifications
+        - Methodologies
+        
+        Return only the skills as a JSON array of strings, no explanations.
+        """
+    
     def _fallback_keyword_extraction(self, text: str) -> List[str]:
         """
         Fallback keyword extraction using regex patterns.
@@ -160,39 +456,119 @@ class ATSScorer:
         
         return list(set(skills))
     
-    def _calculate_keyword_score(self, job_keywords: List[str], resume_keywords: List[str]) -> float:
+    def _match_terms(self, job_terms: List[str], resume_terms: List[str],
+                     semantic: Optional[bool] = None) -> TermMatch:
+        """
+        Match job terms against resume terms, either exactly or semantically
+        (ATS_MATCHING_MODE="semantic"), so that e.g. "postgres" matches "postgresql".
+        """
+        return self._match_term_lists([(job_terms, resume_terms)], semantic)[0]
+    
+    def _match_term_lists(self, pairs: List[Tuple[List[str], List[str]]],
+                          semantic: Optional[bool] = None) -> List[TermMatch]:
+        """
+        _match_terms for several (job terms, resume terms) pairs, e.g. keywords and
+        skills. Semantic matching embeds the distinct terms of every pair in one
+        batched (cached) call.
+        """
+        pairs = [(list(dict.fromkeys(job_terms)), list(dict.fromkeys(resume_terms))) for job_terms, resume_terms in pairs]
+        if semantic is None:
+            semantic = Config.ATS_MATCHING_MODE == "semantic" and self.embed_texts is not None
+        vectors = None
+        if semantic and any(job_terms and resume_terms for job_terms, resume_terms in pairs):
+            vectors = self._embed_terms(list(dict.fromkeys(
+                term for job_terms, resume_terms in pairs for term in job_terms + resume_terms
+            )))
+        return [
+            self._semantic_match(job_terms, resume_terms, vectors)
+            if vectors is not None and job_terms and resume_terms
+            else self._exact_match(job_terms, resume_terms)
+            for job_terms, resume_terms in pairs
+        ]
+    
+    @staticmethod
+    def _exact_match(job_unique: List[str], resume_unique: List[str]) -> TermMatch:
+        resume_set = set(resume_unique)
+        job_set = set(job_unique)
+        return TermMatch(
+            job_terms=job_unique,
+            matched=[term for term in job_unique if term in resume_set],
+            missing=[term for term in job_unique if term not in resume_set],
+            extra=[term for term in resume_unique if term not in job_set]
+        )
+    
+    def _embed_terms(self, terms: List[str]) -> Optional[Dict]:
+        """
+        Maps each term to its unit-length embedding, from one batched call. Returns
+        None if any is unavailable, so callers fall back to exact matching.
+        """
+        import numpy as np
+        try:
+            embeddings = self.embed_texts(terms)
+        except Exception as e:
+            print(f"Error embedding terms for semantic matching: {e}")
+            return None
+        if any(embedding is None for embedding in embeddings):
+            print("Warning: Could not embed all terms. Falling back to exact matching.")
+            return None
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return dict(zip(terms, vectors))
+    
+    def _semantic_match(self, job_terms: List[str], resume_terms: List[str], vectors: Dict) -> TermMatch:
+        """
+        Compute the full cosine similarity matrix from the terms' unit vectors and
+        greedily pair the most similar terms above the threshold.
+        """
+        import numpy as np
+        similarity = np.stack([vectors[term] for term in job_terms]) @ np.stack([vectors[term] for term in resume_terms]).T
+        # Exact string matches always pair, regardless of embedding noise
+        resume_index = {term: j for j, term in enumerate(resume_terms)}
+        for i, term in enumerate(job_terms):
+            if term in resume_index:
+                similarity[i, resume_index[term]] = 1.0
+        
+        threshold = Config.ATS_SEMANTIC_THRESHOLD
+        matched_job, matched_resume = set(), set()
+        for flat_index in np.argsort(similarity, axis=None)[::-1]:
+            i, j = divmod(int(flat_index), similarity.shape[1])
+            if similarity[i, j] < threshold:
+                break
+            if i in matched_job or j in matched_resume:
+                continue
+            matched_job.add(i)
+            matched_resume.add(j)
+        
+        return TermMatch(
+            job_terms=job_terms,
+            matched=[term for i, term in enumerate(job_terms) if i in matched_job],
+            missing=[term for i, term in enumerate(job_terms) if i not in matched_job],
+            extra=[term for j, term in enumerate(resume_terms) if j not in matched_resume]
+        )
+    
+    def _calculate_keyword_score(self, keyword_match: TermMatch) -> float:
         """
         Calculate keyword matching score (0-100).
         """
-        if not job_keywords:
+        if not keyword_match.job_terms:
             return 0.0
         
-        # Find matching keywords
-        job_keywords_set = set(job_keywords)
-        resume_keywords_set = set(resume_keywords)
-        matching_keywords = job_keywords_set.intersection(resume_keywords_set)
-        
         # Calculate score
-        match_ratio = len(matching_keywords) / len(job_keywords_set)
+        match_ratio = len(keyword_match.matched) / len(keyword_match.job_terms)
         score = match_ratio * 100
         
         return min(score, 100.0)
     
-    def _calculate_skill_score(self, job_skills: List[str], resume_skills: List[str]) -> float:
+    def _calculate_skill_score(self, skill_match: TermMatch) -> float:
         """
         Calculate skill alignment score (0-100).
         """
-        if not job_skills:
+        if not skill_match.job_terms:
             return 0.0
         
-        # Find matching skills
-        job_skills_set = set(job_skills)
-        resume_skills_set = set(resume_skills)
-        matching_skills = job_skills_set.intersection(resume_skills_set)
-        
         # Calculate score with bonus for additional relevant skills
-        match_ratio = len(matching_skills) / len(job_skills_set)
-        bonus = min(len(resume_skills_set - job_skills_set) * 0.05, 0.2)  # Up to 20% bonus
+        match_ratio = len(skill_match.matched) / len(skill_match.job_terms)
+        bonus = min(len(skill_match.extra) * 0.05, 0.2)  # Up to 20% bonus
         score = (match_ratio + bonus) * 100
         
         return min(score, 100.0)
@@ -200,28 +576,15 @@ class ATSScorer:
     def _calculate_experience_relevance(self, job_description: str, tailored_resume: str) -> float:
         """
         Calculate experience relevance score using AI analysis.
+        The resume is trimmed to the lines most relevant to the job description, not by character offset.
         """
-        prompt = f"""
-        Analyze how well the experience described in the resume matches the job requirements.
-        Consider:
-        - Relevance of past roles to the target position
-        - Alignment of responsibilities with job requirements
-        - Quantifiable achievements that match job needs
-        
-        Job Description: {job_description[:500]}...
-        
-        Resume: {tailored_resume[:500]}...
-        
-        Rate the experience relevance from 0-100 and provide a brief explanation.
-        Return as JSON: {{"score": number, "explanation": "string"}}
-        """
+        messages, budget = self._prepare_messages(
+            "experience_relevance", job_description, self._build_experience_prompt,
+            tailored_resume=Section(tailored_resume, query=job_description)
+        )
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.3}
-            )
+            response = llm_client.chat(self.model, "experience_relevance", messages, budget.options(0.3))
             content = response['message']['content']
             
             json_start = content.find('{')
@@ -236,6 +599,18 @@ class ATSScorer:
             print(f"Error calculating experience relevance: {e}")
             return 50.0
     
+    def _build_experience_prompt(self, tailored_resume: str) -> str:
+        return f"""
+        {self._resume_block(tailored_resume)}TASK: Analyze how well the experience described in the resume above matches the job requirements.
+        Consider:
+        - Relevance of past roles to the target position
+        - Alignment of responsibilities with job requirements
+        - Quantifiable achievements that match job needs
+        
+        Rate the experience relevance from 0-100 and provide a brief explanation.
+        Return as JSON: {{"score": number, "explanation": "string"}}
+        """
+    
     def _calculate_format_score(self, tailored_resume: str) -> float:
         """
         Calculate format compliance score (0-100).
@@ -281,29 +656,13 @@ class ATSScorer:
         
         return round(overall_score, 1)
     
-    def _find_missing_keywords(self, job_keywords: List[str], resume_keywords: List[str]) -> List[str]:
-        """
-        Find keywords from job description that are missing in resume.
-        """
-        job_set = set(job_keywords)
-        resume_set = set(resume_keywords)
-        return list(job_set - resume_set)
-    
-    def _find_missing_skills(self, job_skills: List[str], resume_skills: List[str]) -> List[str]:
-        """
-        Find skills from job description that are missing in resume.
-        """
-        job_set = set(job_skills)
-        resume_set = set(resume_skills)
-        return list(job_set - resume_set)
-    
     def _generate_detailed_analysis(self, job_description: str, tailored_resume: str, 
                                   job_keywords: List[str], resume_keywords: List[str]) -> str:
         """
         Generate detailed analysis of the resume-job match.
         """
-        prompt = f"""
-        Provide a detailed analysis of how well the tailored resume matches the job description.
+        task_prompt = f"""
+        TASK: Provide a detailed analysis of how well the tailored resume matches the job description above.
         Focus on:
         1. Keyword alignment and coverage
         2. Skill match and gaps
@@ -315,27 +674,23 @@ class ATSScorer:
         
         Provide a concise analysis (2-3 paragraphs) highlighting strengths and areas for improvement.
         """
+        # Beyond the shared prefix the prompt only carries two short keyword lists, so no sections need fitting
+        messages = build_messages(job_description, task_prompt)
+        budget = PromptBudget("detailed_analysis")
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.4}
-            )
+            response = llm_client.chat(self.model, "detailed_analysis", messages, budget.options(0.4))
             return response['message']['content']
         except Exception as e:
             print(f"Error generating analysis: {e}")
             return "Analysis could not be generated due to an error."
     
-    def _generate_recommendations(self, job_keywords: List[str], resume_keywords: List[str], 
-                                overall_score: float) -> List[str]:
+    def _generate_recommendations(self, missing_keywords: List[str], overall_score: float) -> List[str]:
         """
         Generate specific recommendations for improvement.
         """
         recommendations = []
         
-        missing_keywords = self._find_missing_keywords(job_keywords, resume_keywords)
-        
         if overall_score < 70:
             recommendations.append("Overall ATS score is below optimal. Consider incorporating more job-specific keywords.")
         
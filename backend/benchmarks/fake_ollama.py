@@ -0,0 +1,287 @@
+"""
+A stand-in for the Ollama HTTP API used by the benchmarks. It serves /api/chat
+(streaming and not), /api/embed, /api/embeddings and /api/tags with deterministic
+output and a simulated cost of
+
+    latency + prompt tokens / prompt rate + output tokens / token rate
+
+so pipeline throughput can be measured without a model whose speed varies from
+run to run.
+
+Run standalone with `python -m benchmarks.fake_ollama --port 11435` from backend/.
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+# Terms the canned extraction output is drawn from; the synthetic resumes and job
+# descriptions in run_benchmarks.py use the same vocabulary
+VOCABULARY = [
+    "Python", "SQL", "Docker", "Kubernetes", "AWS", "FastAPI", "React", "TypeScript",
+    "PostgreSQL", "Redis", "Kafka", "Terraform", "CI/CD", "Machine Learning", "GraphQL",
+    "Microservices", "Spark", "Airflow", "Go", "Java",
+]
+
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Same rough estimate the backend's prompt budget uses."""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def embed_text(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector for a text, built from SHA-256 blocks."""
+    values = []
+    counter = 0
+    while len(values) < dimensions:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        values.extend(byte / 127.5 - 1.0 for byte in digest)
+        counter += 1
+    values = values[:dimensions]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class FakeOllamaServer:
+    """
+    Threaded HTTP server speaking enough of the Ollama API for the backend.
+    Timings are simulated with sleeps, so concurrent requests overlap as they
+    would against a server with unlimited parallel slots.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50.0,
+                 tokens_per_second: float = 200.0, prompt_tokens_per_second: float = 4000.0,
+                 embed_latency_ms: float = 5.0, completion_tokens: int = 250, dimensions: int = 256):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.embed_latency_ms = embed_latency_ms
+        self.completion_tokens = completion_tokens
+        self.dimensions = dimensions
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def settings(self) -> Dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "tokens_per_second": self.tokens_per_second,
+            "prompt_tokens_per_second": self.prompt_tokens_per_second,
+            "embed_latency_ms": self.embed_latency_ms,
+            "completion_tokens": self.completion_tokens,
+            "dimensions": self.dimensions,
+        }
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    # --- Responses ---------------------------------------------------------
+
+    def chat_reply(self, body: Dict) -> Tuple[str, int, int, str]:
+        """Returns (content, prompt tokens, output tokens, done_reason) for a chat request."""
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        task = messages[-1].get("content", "") if messages else ""
+        content = self._canned_content(task, prompt, body.get("format"))
+
+        num_predict = (body.get("options") or {}).get("num_predict")
+        output_tokens = count_tokens(content)
+        done_reason = "stop"
+        if num_predict and num_predict > 0 and output_tokens > num_predict:
+            output_tokens, done_reason = num_predict, "length"
+        return content, count_tokens(prompt), output_tokens, done_reason
+
+    def _canned_content(self, task: str, prompt: str, format) -> str:
+        terms = [term for term in VOCABULARY if term.lower() in prompt.lower()] or VOCABULARY[:3]
+        if isinstance(format, dict):
+            extracted = {"keywords": terms[:10], "skills": terms[:6]}
+            if "job" in (format.get("properties") or {}):
+                return json.dumps({"job": extracted, "resume": extracted})
+            return json.dumps(extracted)
+        if "'responsibilities'" in task:
+            return json.dumps({
+                "skills": terms[:5],
+                "responsibilities": [f"Build and operate {term} services" for term in terms[:3]],
+            })
+        if '"score"' in task:
+            return json.dumps({"score": 40 + len(terms) * 3 % 60, "explanation": "Relevant experience found."})
+        if "JSON array" in task:
+            return json.dumps(terms[:8])
+        if "Reply with OK" in task:
+            return "OK"
+        # Free text (synthesis, detailed analysis): roughly completion_tokens long
+        words = []
+        while count_tokens(" ".join(words)) < self.completion_tokens:
+            term = terms[len(words) % len(terms)]
+            words.extend(["-", "Delivered", term, "improvements", "across", "teams."])
+        return " ".join(words)
+
+    def simulated_seconds(self, prompt_tokens: int, output_tokens: int) -> Tuple[float, float]:
+        """(prompt evaluation, generation) time for a chat call, latency included in the first."""
+        prompt_seconds = self.latency_ms / 1000 + prompt_tokens / max(self.prompt_tokens_per_second, 1e-9)
+        return prompt_seconds, output_tokens / max(self.tokens_per_second, 1e-9)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read_json(self) -> Dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                return json.loads(raw or b"{}")
+
+            def _send_json(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                server._count(self.path)
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"model": name, "name": name} for name in self._model_names()]})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                server._count(self.path)
+                try:
+                    body = self._read_json()
+                except ValueError:
+                    self._send_json({"error": "invalid JSON"}, 400)
+                    return
+                if self.path == "/api/chat":
+                    self._chat(body)
+                elif self.path == "/api/embed":
+                    inputs = body.get("input") or []
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    time.sleep(server.embed_latency_ms / 1000)
+                    self._send_json({
+                        "model": body.get("model"),
+                        "embeddings": [embed_text(text, server.dimensions) for text in inputs],
+                    })
+                elif self.path == "/api/embeddings":
+                    time.sleep(server.embed_latency_ms / 1000)
+                    self._send_json({"embedding": embed_text(body.get("prompt") or "", server.dimensions)})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def _model_names(self) -> List[str]:
+                return [Config.LLM_MODEL, Config.EMBEDDING_MODEL]
+
+            def _chat(self, body: Dict):
+                content, prompt_tokens, output_tokens, done_reason = server.chat_reply(body)
+                prompt_seconds, eval_seconds = server.simulated_seconds(prompt_tokens, output_tokens)
+                final = {
+                    "model": body.get("model"),
+                    "created_at": "1970-01-01T00:00:00Z",
+                    "done": True,
+                    "done_reason": done_reason,
+                    "prompt_eval_count": prompt_tokens,
+                    "eval_count": output_tokens,
+                    "prompt_eval_duration": int(prompt_seconds * 1e9),
+                    "eval_duration": int(eval_seconds * 1e9),
+                    "load_duration": 0,
+                    "total_duration": int((prompt_seconds + eval_seconds) * 1e9),
+                }
+                # Truncated output keeps roughly num_predict tokens' worth of words
+                pieces = content.split(" ")
+                if done_reason == "length":
+                    keep = max(1, int(len(pieces) * output_tokens / max(count_tokens(content), 1)))
+                    pieces = pieces[:keep]
+                time.sleep(prompt_seconds)
+
+                if body.get("stream", True) is False:
+                    time.sleep(eval_seconds)
+                    self._send_json({**final, "message": {"role": "assistant", "content": " ".join(pieces)}})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                # A few words per chunk keeps the sleep granularity reasonable
+                step = 4
+                per_piece = eval_seconds / max(len(pieces), 1)
+                for start in range(0, len(pieces), step):
+                    text = " ".join(pieces[start:start + step]) + ("" if start + step >= len(pieces) else " ")
+                    time.sleep(per_piece * len(pieces[start:start + step]))
+                    self._write_chunk({"model": body.get("model"), "message": {"role": "assistant", "content": text},
+                                       "done": False})
+                self._write_chunk({**final, "message": {"role": "assistant", "content": ""}})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, payload: Dict):
+                data = json.dumps(payload).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API for benchmarking.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=4000.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--completion-tokens", type=int, default=250)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        args.host, args.port, args.latency_ms, args.tokens_per_second,
+        args.prompt_tokens_per_second, args.embed_latency_ms, args.completion_tokens
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
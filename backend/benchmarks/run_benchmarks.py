@@ -0,0 +1,359 @@
+"""
+Offline throughput benchmarks for the resume pipeline. A FakeOllamaServer stands
+in for Ollama so results depend only on the backend's own overheads and the
+configured model speed. Chunking, ingestion, the tailoring workflow, ATS scoring
+and the HTTP endpoints are driven at several resume sizes and concurrency levels, and
+p50/p95/p99 latency and requests per second are reported for each.
+
+From backend/:
+
+    python -m benchmarks.run_benchmarks run --output before.json
+    python -m benchmarks.run_benchmarks run --output after.json --baseline before.json
+    python -m benchmarks.run_benchmarks compare before.json after.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+SCENARIOS = ("chunk", "ingest", "workflow", "ats", "api_tailor", "api_ats_fast")
+
+ACTIONS = [
+    "Built", "Designed", "Migrated", "Scaled", "Automated", "Led", "Optimized", "Launched",
+    "Refactored", "Instrumented", "Shipped", "Reduced",
+]
+OBJECTS = [
+    "the billing platform", "a recommendation service", "data ingestion pipelines", "the customer API",
+    "internal developer tooling", "a real-time analytics dashboard", "the search backend",
+    "payment reconciliation jobs", "an event-driven order system", "the mobile sync service",
+]
+OUTCOMES = [
+    "cutting p95 latency by {n}%", "serving {n}M requests a day", "saving ${n}K a year",
+    "improving conversion by {n}%", "reducing incidents by {n}%", "for {n} engineering teams",
+]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Stark", "Wayne"]
+
+
+# --- Synthetic inputs -------------------------------------------------------
+
+def make_resume(bullets: int, seed: int) -> str:
+    """A resume with roughly `bullets` experience lines, deterministic for a seed."""
+    from benchmarks.fake_ollama import VOCABULARY
+    rng = random.Random(seed)
+    lines = ["Jordan Example", "jordan@example.com", "", "SUMMARY",
+             f"Engineer with {rng.randint(4, 15)} years of experience building backend systems.", "",
+             "EXPERIENCE"]
+    per_role = 6
+    for role in range(max(1, (bullets + per_role - 1) // per_role)):
+        lines.append(f"Senior Software Engineer, {rng.choice(COMPANIES)} {seed}-{role}")
+        for _ in range(min(per_role, bullets - role * per_role)):
+            lines.append(
+                f"- {rng.choice(ACTIONS)} {rng.choice(OBJECTS)} with {rng.choice(VOCABULARY)} and "
+                f"{rng.choice(VOCABULARY)}, {rng.choice(OUTCOMES).format(n=rng.randint(5, 90))}"
+            )
+        lines.append("")
+    lines += ["SKILLS", ", ".join(rng.sample(VOCABULARY, 10)), "", "EDUCATION",
+              "B.Sc. Computer Science, State University"]
+    return "\n".join(lines)
+
+
+def make_job_description(seed: int) -> str:
+    """A job posting naming a handful of vocabulary terms; distinct per seed so caches miss."""
+    from benchmarks.fake_ollama import VOCABULARY
+    rng = random.Random(seed)
+    skills = rng.sample(VOCABULARY, 6)
+    return (
+        f"Posting {seed}: Senior Backend Engineer at {rng.choice(COMPANIES)}.\n"
+        f"We are looking for an engineer experienced with {', '.join(skills[:4])}.\n"
+        f"Responsibilities: design and operate services using {skills[4]}, mentor engineers, "
+        f"and own reliability for {rng.choice(OBJECTS)}.\n"
+        f"Nice to have: {skills[5]}, experience with {rng.choice(OBJECTS)}."
+    )
+
+
+# --- Measurement ------------------------------------------------------------
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(call: Callable[[int], object], requests: int, concurrency: int) -> Dict:
+    """Runs call(0..requests-1) on `concurrency` threads and summarizes the latencies."""
+    def timed(index: int):
+        started = time.perf_counter()
+        try:
+            call(index)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return time.perf_counter() - started, error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+        outcomes = list(executor.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, error in outcomes if error is None)
+    errors = [error for _, error in outcomes if error is not None]
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def post_json(url: str, payload: Dict, timeout: float = 300.0) -> Dict:
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+# --- Running ----------------------------------------------------------------
+
+def run(args) -> Dict:
+    # Backend modules read their configuration at import time, so the environment is
+    # prepared first: throwaway storage, no start-up warm-up, and the memo off unless
+    # asked for so repeated requests still reach the (fake) model
+    workdir = tempfile.mkdtemp(prefix="careerpilot-bench-")
+    os.environ.update({
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "LLM_MEMO_PATH": os.path.join(workdir, "llm_memo.sqlite3"),
+        "LLM_MEMO_ENABLED": "true" if args.memo else "false",
+        "WARMUP_ON_STARTUP": "false",
+    })
+    from benchmarks.fake_ollama import FakeOllamaServer
+    from config import Config
+
+    fake = FakeOllamaServer(
+        latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        embed_latency_ms=args.embed_latency_ms, completion_tokens=args.completion_tokens
+    ).start()
+    # The ollama library's default client reads OLLAMA_HOST when it is first imported
+    os.environ["OLLAMA_HOST"] = fake.url
+    Config.OLLAMA_HOST = fake.url
+
+    import uvicorn
+    import main
+    from mcp_orchestrator import JobDescription
+    mcp = main.get_mcp()
+
+    api_url = None
+    if any(scenario.startswith("api_") for scenario in args.scenarios):
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, name="bench-api", daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        api_url = f"http://127.0.0.1:{port}"
+
+    seeds = itertools.count(1)
+    next_seed = lambda: next(seeds)
+    ingested = set()
+
+    def profile_for(size: int) -> str:
+        """A profile holding a resume of the given size, ingested on first use."""
+        profile = f"bench-{size}"
+        if profile not in ingested:
+            mcp.ingest_master_resume(make_resume(size, next_seed()), profile)
+            ingested.add(profile)
+        return profile
+
+    def scenario_call(scenario: str, size: int) -> Callable[[int], object]:
+        if scenario == "chunk":
+            # Chunking and deduplication alone, which run before any embedding call
+            from chunker import ResumeChunker
+            chunker, resume = ResumeChunker(), make_resume(size, next_seed())
+            return lambda _: chunker.chunk(resume)
+        if scenario == "ingest":
+            # A fresh profile and resume every time, so nothing is served from caches
+            return lambda _: mcp.ingest_master_resume(
+                make_resume(size, next_seed()), f"bench-ingest-{size}-{next_seed()}"
+            )
+        if scenario == "workflow":
+            profile = profile_for(size)
+            return lambda _: mcp.tailor_resume_workflow(
+                JobDescription(text=make_job_description(next_seed())), profile
+            )
+        if scenario == "ats":
+            return lambda _: mcp.ats_scorer.calculate_ats_score(
+                make_job_description(next_seed()), make_resume(size, next_seed())
+            )
+        if scenario == "api_tailor":
+            profile = profile_for(size)
+            return lambda _: post_json(
+                f"{api_url}/tailor-resume/?profile={profile}", {"text": make_job_description(next_seed())}
+            )
+        if scenario == "api_ats_fast":
+            return lambda _: post_json(f"{api_url}/ats-score/", {
+                "job_description": make_job_description(next_seed()),
+                "resume": make_resume(size, next_seed()), "mode": "fast",
+            })
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    results = []
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            for concurrency in args.concurrency:
+                requests = max(args.requests, concurrency)
+                with _backend_output(args.verbose):
+                    call = scenario_call(scenario, size)
+                    # One untimed call so connection setup and lazy imports are not measured
+                    call(-1)
+                    result = measure(call, requests, concurrency)
+                result = {"scenario": scenario, "size": size, "concurrency": concurrency, **result}
+                results.append(result)
+                print(_format_row(result), flush=True)
+
+    fake.stop()
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": args.label,
+        "fake_ollama": fake.settings(),
+        "fake_ollama_requests": fake.requests,
+        "config": {
+            "llm_memo_enabled": args.memo,
+            "ollama_max_parallel": Config.OLLAMA_MAX_PARALLEL,
+            "retrieval_mode": Config.RETRIEVAL_MODE,
+            "ats_extraction_mode": Config.ATS_EXTRACTION_MODE,
+            "vector_store_backend": Config.VECTOR_STORE_BACKEND,
+        },
+        "results": results,
+    }
+
+
+@contextlib.contextmanager
+def _backend_output(verbose: bool):
+    """Silences the backend's progress prints while measuring unless --verbose is set."""
+    if verbose:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# --- Reporting --------------------------------------------------------------
+
+HEADER = f"{'scenario':<14}{'size':>6}{'conc':>6}{'reqs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}"
+
+def _format_row(result: Dict) -> str:
+    return (f"{result['scenario']:<14}{result['size']:>6}{result['concurrency']:>6}{result['requests']:>6}"
+            f"{result['errors']:>5}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+            f"{result['rps']:>9}")
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Rows of percentage changes for every (scenario, size, concurrency) present in both runs."""
+    def key(result: Dict):
+        return result["scenario"], result["size"], result["concurrency"]
+
+    def change(old: float, new: float) -> str:
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    before = {key(result): result for result in baseline["results"]}
+    lines = [f"{'scenario':<14}{'size':>6}{'conc':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'rps':>10}"]
+    for result in current["results"]:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        lines.append(
+            f"{result['scenario']:<14}{result['size']:>6}{result['concurrency']:>6}"
+            f"{change(old['p50_ms'], result['p50_ms']):>10}{change(old['p95_ms'], result['p95_ms']):>10}"
+            f"{change(old['p99_ms'], result['p99_ms']):>10}{change(old['rps'], result['rps']):>10}"
+        )
+    if baseline.get("fake_ollama") != current.get("fake_ollama"):
+        lines.append("Note: the runs used different fake Ollama settings.")
+    return lines
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a fake Ollama server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument("--scenarios", type=lambda v: [s for s in v.split(",") if s], default=list(SCENARIOS),
+                            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--sizes", type=_int_list, default=[20, 80, 320],
+                            help="Resume sizes in experience bullets (default: 20,80,320)")
+    run_parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 8],
+                            help="Concurrency levels (default: 1,4,8)")
+    run_parser.add_argument("--requests", type=int, default=16, help="Requests per measurement (default: 16)")
+    run_parser.add_argument("--latency-ms", type=float, default=50.0, help="Fixed cost of every chat call")
+    run_parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Generation speed")
+    run_parser.add_argument("--prompt-tokens-per-second", type=float, default=4000.0,
+                            help="Prompt evaluation speed")
+    run_parser.add_argument("--embed-latency-ms", type=float, default=5.0, help="Cost of every embedding call")
+    run_parser.add_argument("--completion-tokens", type=int, default=250,
+                            help="Length of free-text answers (synthesis, detailed analysis)")
+    run_parser.add_argument("--memo", action="store_true", help="Leave the LLM response memo enabled")
+    run_parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    run_parser.add_argument("--output", help="Write the results as JSON to this path")
+    run_parser.add_argument("--baseline", help="Compare against the results in this JSON file")
+    run_parser.add_argument("--verbose", action="store_true", help="Show the backend's progress output")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        print("\n".join(compare(_load(args.baseline), _load(args.current))))
+        return
+
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    print(HEADER, flush=True)
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        print("\nChange against baseline:")
+        print("\n".join(compare(_load(args.baseline), report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import hashlib
+import re
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from config import Config
+
+# Bump when chunking output changes so stored collections are rebuilt on the next ingest
+CHUNKER_VERSION = "sections-2"
+
+SECTION_HEADERS = {
+    "summary": ["summary", "professional summary", "profile", "objective", "about me", "career objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"],
+    "projects": ["projects", "personal projects", "selected projects", "key projects", "portfolio"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "technologies",
+               "tools", "tech stack", "skills & tools", "skills and tools"],
+    "education": ["education", "academic background", "qualifications", "academics"],
+    "certifications": ["certifications", "certificates", "licenses", "licenses & certifications",
+                       "licenses and certifications", "awards", "achievements", "honors"],
+}
+HEADER_LOOKUP = {alias: section for section, aliases in SECTION_HEADERS.items() for alias in aliases}
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•▪◦·–—●■]|\d+[.)])\s+")
+DATE_RANGE_PATTERN = re.compile(
+    r"((jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(19|20)\d{2}\s*(-|–|—|to)\s*"
+    r"(((jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(19|20)\d{2}|present|current|now)",
+    re.IGNORECASE
+)
+CONTACT_ITEM = (
+    r"(?:(?:e-?mail|phone|tel|mobile|cell|linkedin|github|web|website|portfolio)\s*:\s*)?"
+    r"(?:[\w.+-]+@[\w-]+\.[\w.]+"                                # email
+    r"|(?:https?://|www\.|(?:[\w-]+\.)*(?:linkedin|github)\.com\b)\S*"  # profile or site link
+    r"|\+?\(?\d(?:[\s().-]*\d){8,})"                              # phone number: 9+ digits
+)
+# A line made up only of contact details and separators, e.g. "jane@x.com | +1 555 123 4567"
+CONTACT_LINE_PATTERN = re.compile(rf"{CONTACT_ITEM}(?:\s*[|,;•·/]?\s*{CONTACT_ITEM})*[\s|,;•·/]*", re.IGNORECASE)
+SENTENCE_END = (".", "!", "?", ":", ";")
+
+
+class ResumeChunk(NamedTuple):
+    text: str
+    section: str   # one of SECTION_HEADERS' keys, or "other"
+    role: str      # role/employer heading the chunk belongs to, or "" if none
+
+
+class ResumeChunker:
+    """
+    Section-aware resume chunker. Detects section headers (experience, projects,
+    skills, education, ...), re-joins lines that PDF extraction wrapped, drops
+    headers/dates/contact lines, and removes near-duplicate chunks: exact repeats
+    by their normalized text, then near-duplicates by a MinHash estimate of word and
+    word-bigram overlap. LSH banding limits the MinHash comparisons to chunks that
+    share a band, so deduplication stays roughly linear in the number of chunks.
+    """
+
+    def __init__(self, min_chars: int = 11,
+                 duplicate_threshold: float = Config.CHUNK_DUPLICATE_THRESHOLD,
+                 num_hashes: int = 64, bands: int = 16):
+        if num_hashes % bands:
+            raise ValueError("num_hashes must be a multiple of bands")
+        self.min_chars = min_chars
+        self.duplicate_threshold = duplicate_threshold
+        self.num_hashes = num_hashes
+        # 16 bands of 4 rows: pairs at 0.7 similarity share a band ~99% of the time, pairs at 0.2 ~3%
+        self.bands = bands
+        self.rows = num_hashes // bands
+
+    def chunk(self, resume_content: str) -> List[ResumeChunk]:
+        chunks = self._split(resume_content.splitlines())
+        return self._drop_near_duplicates(chunks)
+
+    def chunk_pages(self, pages: Iterable[str]) -> List[ResumeChunk]:
+        """
+        Chunks a document given page by page (e.g. streamed from PDF extraction).
+        Lines are consumed as pages arrive, and a bullet wrapped across a page
+        break is re-joined like any other wrapped line.
+        """
+        chunks = self._split(line for page in pages for line in page.splitlines())
+        return self._drop_near_duplicates(chunks)
+
+    def _section_for_header(self, line: str) -> Optional[str]:
+        normalized = re.sub(r"[^a-z& ]", "", line.lower()).strip()
+        if len(normalized.split()) > 5:
+            return None
+        return HEADER_LOOKUP.get(normalized)
+
+    def _is_role_line(self, line: str, section: str) -> bool:
+        """A non-bullet line carrying a date range inside experience/projects heads a new role."""
+        return (section in ("experience", "projects")
+                and not BULLET_PATTERN.match(line)
+                and bool(DATE_RANGE_PATTERN.search(line))
+                and len(line) < 160)
+
+    def _split(self, lines: Iterable[str]) -> List[ResumeChunk]:
+        section, role = "other", ""
+        chunks: List[ResumeChunk] = []
+        current: List[str] = []
+
+        def flush():
+            if current:
+                text = " ".join(current).strip()
+                # Skill lists are short ("Python, Go, SQL") but are exactly what retrieval should find
+                long_enough = len(text) >= (2 if section == "skills" else self.min_chars)
+                if long_enough and not CONTACT_LINE_PATTERN.fullmatch(text):
+                    chunks.append(ResumeChunk(text, section, role))
+                current.clear()
+
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                flush()
+                continue
+
+            header_section = self._section_for_header(line)
+            if header_section is not None:
+                flush()
+                section, role = header_section, ""
+                continue
+
+            if self._is_role_line(line, section):
+                flush()
+                role = DATE_RANGE_PATTERN.sub("", line).strip(" |,-–—()")
+                continue
+
+            # Contact details and bare dates carry no retrievable experience; only lines
+            # consisting of nothing else are dropped
+            if section == "other" and CONTACT_LINE_PATTERN.fullmatch(line):
+                continue
+            if DATE_RANGE_PATTERN.fullmatch(line):
+                continue
+
+            bullet = BULLET_PATTERN.match(line)
+            if bullet:
+                flush()
+                current.append(line[bullet.end():])
+            elif current and not current[-1].endswith(SENTENCE_END) and (line[0].islower() or line[0] in "(&,"):
+                # Continuation of a line that PDF extraction wrapped
+                current.append(line)
+            else:
+                flush()
+                current.append(line)
+        flush()
+        return chunks
+
+    def _signature(self, words: List[str]) -> Tuple[int, ...]:
+        # Words plus word bigrams: resume bullets are short, so longer shingles make
+        # a single inserted word look like a completely different chunk
+        shingles = set(words) | {" ".join(words[i:i + 2]) for i in range(len(words) - 1)}
+        if not shingles:
+            return (0,) * self.num_hashes
+        # One SHAKE digest per shingle supplies all num_hashes 32-bit hash values at once
+        hashes = [array("I", hashlib.shake_128(s.encode()).digest(4 * self.num_hashes)) for s in shingles]
+        return tuple(map(min, *hashes)) if len(hashes) > 1 else tuple(hashes[0])
+
+    def _similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_hashes
+
+    def _drop_near_duplicates(self, chunks: List[ResumeChunk]) -> List[ResumeChunk]:
+        """Keeps the longest chunk of each near-duplicate group, preserving document order."""
+        # Longest first so the most complete variant of a duplicate group survives
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i].text), reverse=True)
+        kept: List[int] = []
+        seen_texts = set()
+        signatures: Dict[int, Tuple[int, ...]] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        for i in order:
+            words = re.findall(r"\w+", chunks[i].text.lower())
+            normalized = " ".join(words)
+            if normalized in seen_texts:
+                continue
+            signature = self._signature(words)
+            bands = [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+            candidates = {j for band in bands for j in buckets.get(band, ())}
+            if any(self._similarity(signature, signatures[j]) >= self.duplicate_threshold for j in candidates):
+                continue
+            kept.append(i)
+            seen_texts.add(normalized)
+            signatures[i] = signature
+            for band in bands:
+                buckets.setdefault(band, []).append(i)
+        dropped = len(chunks) - len(kept)
+        if dropped:
+            print(f"Chunker: dropped {dropped} near-duplicate chunks.")
+        return [chunks[i] for i in sorted(kept)]
@@ -3,7 +3,72 @@ import os
 class Config:
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", os.path.join(os.path.dirname(__file__), "chroma_db"))
+    # "chroma" (ChromaDB) or "numpy" (memory-mapped vectors, exact search; lighter and faster to start)
+    VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+    NUMPY_STORE_PATH = os.getenv("NUMPY_STORE_PATH", os.path.join(os.path.dirname(__file__), "vector_store"))
+    VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")  # or "float16" to halve disk and memory
+    # Per-profile resume collections kept open at once (least recently used are closed first)
+    MAX_OPEN_COLLECTIONS = int(os.getenv("MAX_OPEN_COLLECTIONS", "16"))
+    # "multi_query" embeds each extracted skill/responsibility separately and fuses the
+    # rankings (reciprocal-rank fusion); "single" searches with one combined query
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "multi_query")
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    # Sections searched during tailoring (comma-separated, e.g. "experience,projects"); empty searches all
+    RETRIEVAL_SECTIONS = [s.strip() for s in os.getenv("RETRIEVAL_SECTIONS", "").split(",") if s.strip()]
+    # MinHash similarity above which two resume chunks count as near-duplicates
+    CHUNK_DUPLICATE_THRESHOLD = float(os.getenv("CHUNK_DUPLICATE_THRESHOLD", "0.7"))
     LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "mxbai-embed-large")
+    # Context window requested on every LLM call; prompts are trimmed to fit it.
+    # Kept constant across calls because Ollama reloads the model when num_ctx changes.
+    LLM_NUM_CTX = int(os.getenv("LLM_NUM_CTX", "4096"))
+    # Every prompt starts with the same system prompt and job description so Ollama can
+    # reuse their KV cache across calls; this caps the job description's share of it
+    JOB_PREFIX_MAX_TOKENS = int(os.getenv("JOB_PREFIX_MAX_TOKENS", "1536"))
+    # How long Ollama keeps models loaded after a request ("30m", "1h", or seconds; -1 = forever)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Number of chunks sent to the embedding model per request during ingestion,
+    # and how many of those batches may be in flight at once.
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "4"))
+    # On-disk embedding cache shared by ingestion and retrieval
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(__file__), "embedding_cache.sqlite3"))
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+    # Max concurrent LLM calls issued by the whole backend; match OLLAMA_NUM_PARALLEL on the server
+    OLLAMA_MAX_PARALLEL = int(os.getenv("OLLAMA_MAX_PARALLEL", "4"))
+    # How ATSScorer extracts keywords/skills: "separate" (one call per list and text),
+    # "combined" (one call per text) or "paired" (one call for both texts)
+    ATS_EXTRACTION_MODE = os.getenv("ATS_EXTRACTION_MODE", "combined")
+    # Job-description analysis cache shared by the analyzer and the ATS scorer
+    JD_CACHE_TTL_SECONDS = float(os.getenv("JD_CACHE_TTL_SECONDS", "86400"))
+    JD_CACHE_MAX_ENTRIES = int(os.getenv("JD_CACHE_MAX_ENTRIES", "256"))
+    # "exact" compares keyword/skill strings; "semantic" (opt-in, changes scores) matches them by
+    # embedding similarity above the threshold, which depends on the embedding model
+    ATS_MATCHING_MODE = os.getenv("ATS_MATCHING_MODE", "exact")
+    ATS_SEMANTIC_THRESHOLD = float(os.getenv("ATS_SEMANTIC_THRESHOLD", "0.8"))
+    # Skill/keyword lexicon used by the LLM-free fast ATS scoring mode
+    ATS_LEXICON_PATH = os.getenv("ATS_LEXICON_PATH", os.path.join(os.path.dirname(__file__), "data", "ats_lexicon.json"))
+    # Background job queue for tailoring runs
+    JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(os.path.dirname(__file__), "jobs.sqlite3"))
+    JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "1"))
+    # Finished jobs (and their results) are deleted after this long; 0 keeps them forever
+    JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+    # On-disk memo of LLM responses, enabled per call site by task name. The default covers the
+    # low-temperature analysis and scoring calls; creative tasks ("synthesis", "detailed_analysis")
+    # are only memoized when added here
+    LLM_MEMO_ENABLED = os.getenv("LLM_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+    LLM_MEMO_PATH = os.getenv("LLM_MEMO_PATH", os.path.join(os.path.dirname(__file__), "llm_memo.sqlite3"))
+    LLM_MEMO_MAX_MB = int(os.getenv("LLM_MEMO_MAX_MB", "64"))
+    LLM_MEMO_TASKS = [t.strip() for t in os.getenv(
+        "LLM_MEMO_TASKS", "job_analysis,term_extraction,list_extraction,experience_relevance"
+    ).split(",") if t.strip()]
+    # Load models and open the default collection in the background when the backend starts
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    # Resume uploads are streamed to a temp file and rejected (413) as soon as they exceed this size
+    MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+    # PDF pages are extracted in this many worker processes (0 extracts in the request's thread);
+    # pages taking longer than the timeout are skipped
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "15"))
     # You might want to add API keys for external scrapers here,
     # but for a local-first app, it's better to pass them from the frontend if needed.
@@ -0,0 +1,101 @@
+import hashlib
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+from config import Config
+from llm_client import keep_alive
+from metrics import EMBEDDING_SECONDS, EMBEDDING_TEXTS, span
+from sqlite_lru import SQLiteLRUStore
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of embeddings keyed by (model, normalized text).
+    Backed by SQLite with size-based LRU eviction so repeat work costs a disk read.
+    """
+
+    def __init__(self, path: str = Config.EMBEDDING_CACHE_PATH,
+                 max_bytes: int = Config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.store = SQLiteLRUStore(path, "embeddings", "vector BLOB NOT NULL", max_bytes, name="embedding",
+                                    extra_columns=("model TEXT NOT NULL",))
+        print(f"Initialized embedding cache at {path}")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace and unicode variants that do not change meaning."""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{cls.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Returns cached embeddings for the given texts, keyed by the original text.
+        Texts that are not cached are simply absent from the result.
+        """
+        keys = {text: self.make_key(model, text) for text in texts}
+        blobs = self.store.get_many(keys.values())
+        return {text: array("f", blobs[key]).tolist() for text, key in keys.items() if key in blobs}
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Stores embeddings for the given texts and evicts least recently used entries if over budget."""
+        self.store.put_many(
+            {self.make_key(model, text): array("f", embedding).tobytes() for text, embedding in items.items()},
+            model=model
+        )
+
+    def stats(self) -> Dict:
+        return self.store.stats()
+
+
+class CachedEmbedder:
+    """Embeds texts with Ollama in batches, serving repeats from the EmbeddingCache."""
+
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.cache = cache or EmbeddingCache()
+
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Returns one embedding per text (None where embedding failed). Cached
+        embeddings are served from disk; only misses go to the embedding model.
+        """
+        cached = self.cache.get_many(Config.EMBEDDING_MODEL, texts)
+        misses = list(dict.fromkeys(text for text in texts if text not in cached))
+        if misses:
+            fresh = self._embed_uncached(misses)
+            self.cache.put_many(Config.EMBEDDING_MODEL, fresh)
+            cached.update(fresh)
+        return [cached.get(text) for text in texts]
+
+    def _embed_uncached(self, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Embeds texts with a single multi-input embed call. If the batch request
+        fails, falls back to embedding each text on its own so that one bad
+        chunk is skipped instead of losing the whole batch.
+        """
+        import ollama
+        EMBEDDING_TEXTS.inc(len(texts))
+        try:
+            with span(EMBEDDING_SECONDS, call="embed", texts=len(texts)):
+                response = ollama.embed(model=Config.EMBEDDING_MODEL, input=texts, keep_alive=keep_alive())
+            embeddings = response.get('embeddings') or []
+            if len(embeddings) == len(texts):
+                return dict(zip(texts, embeddings))
+            print(f"Warning: Batch embed returned {len(embeddings)} of {len(texts)} embeddings. Retrying per chunk.")
+        except Exception as e:
+            print(f"Error generating batch embeddings: {e}. Retrying per chunk.")
+
+        embedded = {}
+        for i, text in enumerate(texts):
+            try:
+                with span(EMBEDDING_SECONDS, call="embeddings"):
+                    response = ollama.embeddings(model=Config.EMBEDDING_MODEL, prompt=text, keep_alive=keep_alive())
+                if 'embedding' in response:
+                    embedded[text] = response['embedding']
+                else:
+                    print(f"Warning: No embedding found for chunk {i}. Skipping.")
+            except Exception as e:
+                print(f"Error generating embedding for chunk {i}: {e}")
+        return embedded
@@ -0,0 +1,72 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import Config
+from metrics import CACHE_REQUESTS
+
+class JobAnalysisCache:
+    """
+    In-memory store of job-description analysis results, shared by the agents that
+    analyze a posting. Entries are keyed by a hash of the normalized JD text plus the
+    LLM model, expire after a TTL, and the least recently used entries are dropped
+    once the cache is full.
+    """
+
+    def __init__(self, model: str = Config.LLM_MODEL,
+                 ttl_seconds: float = Config.JD_CACHE_TTL_SECONDS,
+                 max_entries: int = Config.JD_CACHE_MAX_ENTRIES):
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, job_description: str) -> str:
+        normalized = " ".join(job_description.split())
+        return hashlib.sha256(f"{self.model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, job_description: str, field: str) -> Optional[Any]:
+        """Returns a cached analysis field (e.g. 'analysis', 'terms') for this posting, if present."""
+        key = self.make_key(job_description)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl_seconds:
+                del self._entries[key]
+                item = None
+            if item is None or field not in item[1]:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="jd_analysis", result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="jd_analysis", result="hit")
+            return item[1][field]
+
+    def put(self, job_description: str, field: str, value: Any):
+        """Stores an analysis field for this posting, keeping its other fields."""
+        key = self.make_key(job_description)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl_seconds:
+                item = (time.monotonic(), {})
+            item[1][field] = value
+            self._entries[key] = item
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError
+from typing import Callable, Dict, Optional
+from config import Config
+
+# Lower value runs first; interactive requests jump ahead of bulk work
+PRIORITIES = {"interactive": 0, "batch": 10}
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# How often idle workers delete finished jobs past Config.JOB_RETENTION_HOURS
+PURGE_INTERVAL_SECONDS = 600
+
+class JobQueue:
+    """
+    Persistent background job queue backed by SQLite. Submitted jobs survive client
+    disconnects and restarts; a fixed number of worker threads drain the queue in
+    priority order so load on the Ollama server stays predictable.
+
+    Handlers are called as handler(payload, cancelled). `cancelled` is a
+    threading.Event set when the job is cancelled; handlers check it between steps
+    and stop by raising concurrent.futures.CancelledError.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[dict, threading.Event], dict]],
+                 path: str = Config.JOB_QUEUE_PATH,
+                 workers: int = Config.JOB_QUEUE_WORKERS,
+                 retention_seconds: float = Config.JOB_RETENTION_HOURS * 3600):
+        self.handlers = handlers
+        self.path = path
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        # Cancellation flags of the jobs currently running, by job ID
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority, created_at)")
+        self._conn.commit()
+
+    def start(self):
+        """
+        Re-queues jobs interrupted by a previous shutdown (finishing those that were
+        being cancelled), purges expired finished jobs and starts the workers.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE status = 'cancelling'", (time.time(),)
+            )
+            recovered = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+            self._conn.commit()
+            self._purge_expired()
+        if recovered:
+            print(f"Job queue: re-queued {recovered} interrupted jobs.")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Job queue started with {self.workers} workers at {self.path}")
+
+    def stop(self):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+    def submit(self, kind: str, payload: dict, priority: str = "interactive") -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Expected one of {list(PRIORITIES)}")
+        job_id = uuid.uuid4().hex
+        with self._wakeup:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, PRIORITIES[priority], json.dumps(payload), time.time())
+            )
+            self._conn.commit()
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            position = None
+            if row is not None and row["status"] == "queued":
+                position = self._conn.execute(
+                    """SELECT COUNT(*) FROM jobs WHERE status = 'queued'
+                       AND (priority < ? OR (priority = ? AND created_at < ?))""",
+                    (row["priority"], row["priority"], row["created_at"])
+                ).fetchone()[0]
+        if row is None:
+            return None
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "priority": next((name for name, value in PRIORITIES.items() if value == row["priority"]), row["priority"]),
+            "status": row["status"],
+            "queue_position": position,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancels a job. Queued jobs are cancelled immediately; a running job is marked
+        'cancelling' and its handler is signalled, so it stops before its next step
+        (the step in flight still finishes, and any result is discarded).
+        Returns the resulting status, or None if the job does not exist.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            status = row["status"]
+            if status == "queued":
+                status = "cancelled"
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id)
+                )
+            elif status == "running":
+                status = "cancelling"
+                self._conn.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+                if job_id in self._cancel_events:
+                    self._cancel_events[job_id].set()
+            self._conn.commit()
+            return status
+
+    def _purge_expired(self) -> int:
+        """Deletes finished jobs older than the retention period. Call with the lock held."""
+        self._last_purge = time.time()
+        if self.retention_seconds <= 0:
+            return 0
+        purged = self._conn.execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+            (*FINISHED_STATUSES, time.time() - self.retention_seconds)
+        ).rowcount
+        self._conn.commit()
+        if purged:
+            print(f"Job queue: deleted {purged} finished jobs past retention.")
+        return purged
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        row = self._conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"])
+            )
+            self._conn.commit()
+            self._cancel_events[row["id"]] = threading.Event()
+        return row
+
+    def _worker(self):
+        while True:
+            with self._wakeup:
+                row = None
+                while not self._stopping:
+                    row = self._claim_next()
+                    if row is not None:
+                        break
+                    if time.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                        self._purge_expired()
+                    self._wakeup.wait(timeout=5)
+                if row is None:
+                    return
+
+            print(f"Job queue: running job {row['id']} ({row['kind']})")
+            result, error = None, None
+            try:
+                result = json.dumps(self.handlers[row["kind"]](json.loads(row["payload"]), self._cancel_events[row["id"]]))
+            except CancelledError as e:
+                # Expected after cancel(); if the job itself was not cancelled, one of its
+                # workflow steps was, and the job is recorded as failed below
+                error = f"Workflow was cancelled: {e}" if str(e) else "Workflow was cancelled"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+
+            with self._lock:
+                self._cancel_events.pop(row["id"], None)
+                current = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                if current is not None and current["status"] == "cancelling":
+                    status, result, error = "cancelled", None, None
+                    print(f"Job queue: job {row['id']} stopped after cancellation.")
+                else:
+                    status = "failed" if error is not None else "completed"
+                    if error is not None:
+                        print(f"Job queue: job {row['id']} failed: {error}")
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (status, result, error, time.time(), row["id"])
+                )
+                self._conn.commit()
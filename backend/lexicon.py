@@ -0,0 +1,88 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+# Keeps tokens like "c++", "c#", "node.js" and "ci/cd" intact while dropping trailing punctuation
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:[./\-][a-z0-9+#]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or our that the their this to
+was we were will with you your who what when where which while about across all also any can more
+most other over such than them they through under using within work working team role years
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+class Lexicon:
+    """
+    Skill/keyword lexicon compiled once into a token trie. Scanning a text is a single
+    left-to-right pass taking the longest match at each position, and every alias is
+    normalized to its canonical term (e.g. "k8s" -> "kubernetes").
+    """
+
+    def __init__(self, terms: Dict[str, Dict[str, List[str]]]):
+        self.categories = list(terms)
+        self._trie: dict = {}
+        self.size = 0
+        for category, entries in terms.items():
+            for canonical, aliases in entries.items():
+                for surface in [canonical, *aliases]:
+                    self._insert(tokenize(surface), canonical, category)
+
+    @classmethod
+    def load(cls, path: str = Config.ATS_LEXICON_PATH) -> "Lexicon":
+        with open(path, encoding="utf-8") as f:
+            lexicon = cls(json.load(f))
+        print(f"Loaded ATS lexicon with {lexicon.size} surface forms from {path}")
+        return lexicon
+
+    def _insert(self, tokens: List[str], canonical: str, category: str):
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if None not in node:
+            self.size += 1
+        # The None key marks the end of a term; first definition wins on conflicts
+        node.setdefault(None, (canonical, category))
+
+    def scan(self, text: str) -> Dict[str, Counter]:
+        """Returns, per category, a Counter of canonical terms found in the text."""
+        found = {category: Counter() for category in self.categories}
+        tokens = tokenize(text)
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            match: Optional[Tuple[int, Tuple[str, str]]] = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if None in node:
+                    match = (j, node[None])
+            if match is None:
+                i += 1
+                continue
+            end, (canonical, category) = match
+            found[category][canonical] += 1
+            i = end
+        return found
+
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_lock = threading.Lock()
+
+def get_lexicon() -> Lexicon:
+    """Returns the process-wide lexicon, compiling it on first use."""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = Lexicon.load()
+    return _lexicon
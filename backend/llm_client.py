@@ -0,0 +1,185 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from llm_memo import LLMResponseMemo, get_memo
+from metrics import LLM_DURATION_SECONDS, LLM_SECONDS, LLM_TOKENS, span
+from prompt_budget import estimate_tokens
+from prompts import messages_text
+
+if TYPE_CHECKING:
+    import ollama
+
+# Timing counters Ollama reports on every completed chat call, in nanoseconds
+DURATION_FIELDS = ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")
+
+# Every Ollama chat call in the process (sync, async, streaming, batch or job queue)
+# holds one of these while it is in flight, so the server never sees more than
+# OLLAMA_MAX_PARALLEL requests from this backend
+_llm_slots = threading.BoundedSemaphore(max(1, Config.OLLAMA_MAX_PARALLEL))
+# How often a coroutine waiting for a slot retries; small next to an LLM call
+SLOT_POLL_SECONDS = 0.02
+
+
+@asynccontextmanager
+async def _llm_slot_async():
+    """Holds an LLM slot without blocking the event loop while waiting for one."""
+    while not _llm_slots.acquire(blocking=False):
+        await asyncio.sleep(SLOT_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        _llm_slots.release()
+
+
+def keep_alive():
+    """Config.OLLAMA_KEEP_ALIVE as Ollama expects it: a duration string, or seconds as a number."""
+    value = Config.OLLAMA_KEEP_ALIVE
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def chat(model: str, task: str, messages: List[Dict], options: Dict, format=None,
+         memoize: Optional[bool] = None):
+    """
+    ollama.chat with the shared keep-alive applied and token/timing usage recorded under `task`.
+    memoize=None memoizes the call if its task is listed in Config.LLM_MEMO_TASKS; pass True
+    to opt a call in regardless, or False to always call the model.
+    """
+    with span(LLM_SECONDS, task=task, cached="false") as record:
+        memo, key, cached = _memo_lookup(model, task, messages, options, format, memoize)
+        if cached is not None:
+            record["cached"] = "true"
+            return cached
+        # Imported on first use: the client library is a noticeable share of backend startup time
+        import ollama
+        with _llm_slots:
+            response = ollama.chat(model=model, messages=messages, options=options, format=format,
+                                   keep_alive=keep_alive())
+        record_usage(task, messages, response, record)
+    _memo_store(memo, key, model, task, response)
+    return response
+
+
+async def chat_async(client: "ollama.AsyncClient", model: str, task: str, messages: List[Dict],
+                     options: Dict, format=None, memoize: Optional[bool] = None):
+    """
+    Async variant of chat() using the given Ollama async client. Memo lookups and
+    writes are SQLite I/O, so they run in a worker thread.
+    """
+    with span(LLM_SECONDS, task=task, cached="false") as record:
+        memo, key, cached = await asyncio.to_thread(_memo_lookup, model, task, messages, options, format, memoize)
+        if cached is not None:
+            record["cached"] = "true"
+            return cached
+        async with _llm_slot_async():
+            response = await client.chat(model=model, messages=messages, options=options, format=format,
+                                         keep_alive=keep_alive())
+        record_usage(task, messages, response, record)
+    if memo is not None:
+        await asyncio.to_thread(_memo_store, memo, key, model, task, response)
+    return response
+
+
+def _memo_lookup(model: str, task: str, messages: List[Dict], options: Dict, format,
+                 memoize: Optional[bool]) -> Tuple[Optional[LLMResponseMemo], Optional[str], Optional[Dict]]:
+    """Returns (memo, key, cached response); memo is None when this call should not be memoized."""
+    if memoize is None:
+        memoize = task in Config.LLM_MEMO_TASKS
+    if not (memoize and Config.LLM_MEMO_ENABLED):
+        return None, None, None
+    try:
+        memo = get_memo()
+        key = memo.make_key(model, messages, options, format)
+        return memo, key, memo.get(key)
+    except Exception as e:
+        print(f"LLM response memo unavailable: {e}")
+        return None, None, None
+
+
+def _memo_store(memo: Optional[LLMResponseMemo], key: Optional[str], model: str, task: str, response):
+    # Output cut off by num_predict is not worth replaying
+    if memo is None or _field(response, "done_reason") == "length":
+        return
+    message = _field(response, "message")
+    try:
+        memo.put(key, model, task, {
+            "message": {"role": _field(message, "role") or "assistant", "content": _field(message, "content") or ""},
+            "done_reason": _field(response, "done_reason"),
+        })
+    except Exception as e:
+        print(f"Could not store LLM response in memo: {e}")
+
+
+def chat_stream(model: str, task: str, messages: List[Dict], options: Dict) -> Iterator:
+    """
+    Streaming chat(); usage is recorded from the final part, which carries Ollama's
+    counters. The LLM slot is held until the stream is exhausted or closed.
+    """
+    import ollama
+    with span(LLM_SECONDS, task=task, cached="false") as record, _llm_slots:
+        for part in ollama.chat(model=model, messages=messages, options=options, stream=True,
+                                keep_alive=keep_alive()):
+            if _field(part, "done"):
+                record_usage(task, messages, part, record)
+            yield part
+
+
+def _field(response, name: str):
+    try:
+        return response[name]
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+_usage: Dict[str, Dict[str, float]] = {}
+_usage_lock = threading.Lock()
+
+def record_usage(task: str, messages: List[Dict], response, record: Optional[Dict] = None):
+    """
+    Accumulates Ollama's reported counters per task, exports them as metrics and, if
+    given, adds them to the call's span record. Ollama only counts prompt tokens it
+    actually evaluated, so estimated prompt tokens minus prompt_eval_count
+    approximates how much of the prompt was served from the KV cache.
+    """
+    prompt_eval_count = _field(response, "prompt_eval_count") or 0
+    eval_count = _field(response, "eval_count") or 0
+    estimated = estimate_tokens(messages_text(messages))
+    LLM_TOKENS.inc(prompt_eval_count, task=task, kind="prompt")
+    LLM_TOKENS.inc(eval_count, task=task, kind="completion")
+    for field in ("prompt_eval_duration", "eval_duration", "load_duration"):
+        LLM_DURATION_SECONDS.inc((_field(response, field) or 0) / 1e9, task=task, stage=field.replace("_duration", ""))
+    if record is not None:
+        record.update({
+            "prompt_tokens_estimated": estimated,
+            "prompt_eval_count": prompt_eval_count,
+            "eval_count": eval_count,
+            "prompt_eval_ms": round((_field(response, "prompt_eval_duration") or 0) / 1e6, 1),
+            "eval_ms": round((_field(response, "eval_duration") or 0) / 1e6, 1),
+            "load_ms": round((_field(response, "load_duration") or 0) / 1e6, 1),
+        })
+    with _usage_lock:
+        usage = _usage.setdefault(task, {
+            "calls": 0, "prompt_tokens_estimated": 0, "prompt_eval_count": 0, "eval_count": 0,
+            **{field: 0 for field in DURATION_FIELDS}
+        })
+        usage["calls"] += 1
+        usage["prompt_tokens_estimated"] += estimated
+        usage["prompt_eval_count"] += prompt_eval_count
+        usage["eval_count"] += eval_count
+        for field in DURATION_FIELDS:
+            usage[field] += _field(response, field) or 0
+
+
+def usage_stats() -> Dict[str, Dict[str, float]]:
+    """Per-task totals, with durations in milliseconds and the estimated prefix-cache reuse ratio."""
+    with _usage_lock:
+        snapshot = {task: dict(usage) for task, usage in _usage.items()}
+    for usage in snapshot.values():
+        for field in DURATION_FIELDS:
+            usage[field.replace("_duration", "_ms")] = round(usage.pop(field) / 1e6, 1)
+        estimated = usage["prompt_tokens_estimated"]
+        usage["prompt_reuse_ratio"] = (
+            round(max(0.0, 1 - usage["prompt_eval_count"] / estimated), 3) if estimated else 0.0
+        )
+    return snapshot
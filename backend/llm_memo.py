@@ -0,0 +1,54 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional
+from config import Config
+from sqlite_lru import SQLiteLRUStore
+
+class LLMResponseMemo:
+    """
+    Persistent memo of chat responses keyed by (model, messages, options, format).
+    Meant for low-temperature calls whose output is effectively deterministic, so
+    re-scoring the same texts or retrying a timed-out request is a disk read.
+    Which calls are memoized is decided per task by llm_client (Config.LLM_MEMO_TASKS).
+    """
+
+    def __init__(self, path: str = Config.LLM_MEMO_PATH,
+                 max_bytes: int = Config.LLM_MEMO_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.store = SQLiteLRUStore(path, "responses", "response TEXT NOT NULL", max_bytes, name="llm_memo",
+                                    extra_columns=("model TEXT NOT NULL", "task TEXT NOT NULL"))
+        print(f"Initialized LLM response memo at {path}")
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], options: Optional[Dict], format=None) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "options": options or {}, "format": format},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        blob = self.store.get_many([key]).get(key)
+        return json.loads(blob) if blob is not None else None
+
+    def put(self, key: str, model: str, task: str, response: Dict):
+        """Stores a response and evicts least recently used entries if over budget."""
+        self.store.put_many({key: json.dumps(response, ensure_ascii=False)}, model=model, task=task)
+
+    def stats(self) -> Dict:
+        return self.store.stats()
+
+
+_memo: Optional[LLMResponseMemo] = None
+_memo_lock = threading.Lock()
+
+def get_memo() -> LLMResponseMemo:
+    """Returns the process-wide memo, opening its database on first use."""
+    global _memo
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                _memo = LLMResponseMemo()
+    return _memo
@@ -1,13 +1,131 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+import time
+# Taken before the heavier imports so time-to-ready covers the whole startup
+PROCESS_START = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from mcp_orchestrator import MCPOrcestrator, JobDescription
+from mcp_orchestrator import MCPOrcestrator, JobDescription, JobDescriptionBatch
+from job_queue import JobQueue
+from resume_processor import DEFAULT_PROFILE, collection_name_for
+from prompt_budget import budget_stats
+from llm_memo import get_memo
+from metrics import RequestTrace, iter_traced, render_metrics, request_trace
+from config import Config
+import llm_client
+import pdf_extractor
 import os
+import json
+import asyncio
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# The MCP Orchestrator is built at startup (see lifespan) in a worker thread (its heavy clients are
+# still opened lazily), so request handlers never construct it on the event loop. Scripts that
+# import this module without starting the app get it built on first use.
+_mcp = None
+_mcp_lock = threading.Lock()
+
+def get_mcp() -> MCPOrcestrator:
+    global _mcp
+    if _mcp is None:
+        with _mcp_lock:
+            if _mcp is None:
+                _mcp = MCPOrcestrator()
+    return _mcp
+
+# Startup timings, reported by GET /warmup
+startup_report = {
+    "time_to_ready_ms": None,
+    "time_to_first_response_ms": None,
+    "warmup_status": "not started",
+    "warmup": None,
+}
+_warmup_lock = threading.Lock()
+
+def run_warmup() -> dict:
+    """Runs the orchestrator warm-up once at a time and records its outcome."""
+    with _warmup_lock:
+        startup_report["warmup_status"] = "running"
+        try:
+            startup_report["warmup"] = get_mcp().warm_up()
+            startup_report["warmup_status"] = "done"
+        except Exception as e:
+            startup_report["warmup_status"] = f"failed: {e}"
+            print(f"Warm-up failed: {e}")
+            raise
+        return startup_report["warmup"]
+
+def mark_first_response():
+    """Records time-to-first-useful-response (since process start) the first time a result is served."""
+    if startup_report["time_to_first_response_ms"] is None:
+        startup_report["time_to_first_response_ms"] = round((time.perf_counter() - PROCESS_START) * 1000, 1)
+        print(f"Time to first useful response: {startup_report['time_to_first_response_ms']} ms")
+
+# Background tailoring runs that outlive the HTTP request; its database is opened at startup
+job_queue: Optional[JobQueue] = None
+
+def create_job_queue() -> JobQueue:
+    return JobQueue({
+        "tailor": lambda payload, cancelled: get_mcp().tailor_resume_workflow(
+            JobDescription(**payload["job_description"]), payload.get("profile", DEFAULT_PROFILE), cancelled
+        ),
+    })
+
+class ATSScoreRequest(BaseModel):
+    job_description: str
+    resume: str
+    mode: str = "fast"
+
+class TailorJobRequest(BaseModel):
+    job_description: JobDescription
+    priority: str = "interactive"
+
+def validate_profile(profile: str) -> str:
+    """Rejects profile names that cannot be mapped to a collection."""
+    try:
+        collection_name_for(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profile
+
+def _background_warmup():
+    try:
+        run_warmup()
+    except Exception:
+        # Already recorded in the startup report; requests still work, just without a warm start
+        pass
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the job queue and builds the orchestrator at startup; stops the workers at shutdown."""
+    global job_queue
+    # Opening SQLite and building the orchestrator block, so they run off the event loop
+    job_queue = await run_in_threadpool(create_job_queue)
+    await run_in_threadpool(get_mcp)
+    job_queue.start()
+    startup_report["time_to_ready_ms"] = round((time.perf_counter() - PROCESS_START) * 1000, 1)
+    print(f"Backend ready in {startup_report['time_to_ready_ms']} ms")
+    if Config.WARMUP_ON_STARTUP:
+        threading.Thread(target=_background_warmup, name="warmup", daemon=True).start()
+    try:
+        yield
+    finally:
+        job_queue.stop()
+        pdf_extractor.shutdown()
 
 app = FastAPI(
     title="Career-Pilot AI Local-First Backend",
-    description="Local-first AI resume tailoring application powered by Ollama and ChromaDB."
+    description="Local-first AI resume tailoring application powered by Ollama and ChromaDB.",
+    lifespan=lifespan
 )
 
 # Configure CORS to allow communication from your frontend (e.g., Tauri/Electron app)
@@ -27,73 +145,349 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the MCP Orchestrator
-mcp = MCPOrcestrator()
-
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to Career-Pilot AI Local-First Backend! Status: Running."}
 
-@app.post("/ingest-resume/")
-async def ingest_resume(resume_file: UploadFile = File(...)):
+# The multipart body is parsed by receive_upload rather than FastAPI, so the schema is declared here
+RESUME_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["resume_file"],
+            "properties": {"resume_file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+@app.post("/ingest-resume/", openapi_extra=RESUME_UPLOAD_SCHEMA)
+async def ingest_resume(request: Request, profile: str = DEFAULT_PROFILE):
     """
-    Endpoint to upload and ingest the master resume into ChromaDB.
+    Endpoint to upload and ingest the master resume (multipart field 'resume_file')
+    into the given profile's collection.
     """
-    if not resume_file.filename.endswith(('.txt', '.md', '.pdf')): # Basic file type check
-        raise HTTPException(status_code=400, detail="Only .txt, .md, or .pdf files are supported for resume upload.")
-    
+    validate_profile(profile)
+    filename, path = await receive_upload(request, "resume_file", int(Config.MAX_UPLOAD_MB * 1024 * 1024))
+    file_extension = filename.split('.')[-1].lower()
     try:
-        file_content = await resume_file.read()
-        file_extension = resume_file.filename.split('.')[-1].lower()
-        
         # Handle different file types
         if file_extension == 'pdf':
-            resume_content = extract_text_from_pdf(file_content)
+            # Pages are extracted in worker processes and chunked as they arrive
+            resume_content = pdf_extractor.iter_pdf_pages(path)
         else:
             # For .txt and .md files
-            resume_content = file_content.decode("utf-8")
-        
-        if not resume_content.strip():
-            raise HTTPException(status_code=400, detail="The uploaded file appears to be empty or could not be processed.")
+            with open(path, encoding="utf-8") as f:
+                resume_content = f.read()
+            if not resume_content.strip():
+                raise HTTPException(status_code=400, detail="The uploaded file appears to be empty or could not be processed.")
         
-        result = mcp.ingest_master_resume(resume_content)
+        result = await get_mcp().ingest_master_resume_async(resume_content, profile)
         return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Raised when nothing could be extracted from the upload
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to ingest resume: {e}")
+    finally:
+        os.unlink(path)
 
-def extract_text_from_pdf(pdf_content: bytes) -> str:
+RESUME_EXTENSIONS = ('.txt', '.md', '.pdf')
+# Room for the multipart boundaries and part headers on top of the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+async def receive_upload(request: Request, field: str, max_bytes: int) -> Tuple[str, str]:
     """
-    Extract text from PDF content using PyPDF2.
+    Streams the file in multipart field `field` straight from the request body into
+    a named temp file (which the PDF worker processes can open), so it is written
+    once and never held in memory whole. Requests whose Content-Length is over the
+    limit are rejected with 413 before their body is read, and any other request as
+    soon as it passes the limit. Returns (client filename, path); the caller deletes
+    the file.
     """
+    too_large = HTTPException(
+        status_code=413, detail=f"The uploaded file is larger than the {Config.MAX_UPLOAD_MB:g} MB limit."
+    )
+    max_body = max_bytes + UPLOAD_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise too_large
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+    upload = {"filename": None, "path": None, "out": None, "size": 0}
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part.update(header_name=b"", header_value=b"", disposition=b"", writing=False)
+
+    def on_header_field(data, start, end):
+        part["header_name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["header_value"] += data[start:end]
+
+    def on_header_end():
+        if part["header_name"].lower() == b"content-disposition":
+            part["disposition"] = part["header_value"]
+        part["header_name"] = part["header_value"] = b""
+
+    def on_headers_finished():
+        _, params = parse_options_header(part["disposition"])
+        if params.get(b"name", b"").decode("utf-8", "replace") != field or upload["out"] is not None:
+            return
+        # Browsers may send a full client-side path
+        filename = os.path.basename(params.get(b"filename", b"").decode("utf-8", "replace").replace("\\", "/"))
+        if not filename.lower().endswith(RESUME_EXTENSIONS):  # Basic file type check
+            raise HTTPException(status_code=400, detail="Only .txt, .md, or .pdf files are supported for resume upload.")
+        fd, upload["path"] = tempfile.mkstemp(prefix="careerpilot-upload-", suffix=os.path.splitext(filename)[1])
+        upload["out"], upload["filename"] = os.fdopen(fd, "wb"), filename
+        part["writing"] = True
+
+    def on_part_data(data, start, end):
+        if not part["writing"]:
+            return
+        upload["size"] += end - start
+        if upload["size"] > max_bytes:
+            raise too_large
+        upload["out"].write(data[start:end])
+
+    def on_part_end():
+        part["writing"] = False
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+        "on_header_value": on_header_value, "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished, "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    received = 0
     try:
-        import PyPDF2
-        import io
-        
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        
-        return text.strip()
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise too_large
+            parser.write(chunk)
+        parser.finalize()
+    except HTTPException:
+        _discard_upload(upload)
+        raise
     except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {e}")
+        _discard_upload(upload)
+        raise HTTPException(status_code=400, detail=f"Malformed upload: {e}")
+    if upload["out"] is None:
+        raise HTTPException(status_code=400, detail=f"No '{field}' file in the upload.")
+    upload["out"].close()
+    return upload["filename"], upload["path"]
+
+def _discard_upload(upload: dict):
+    if upload["out"] is not None:
+        upload["out"].close()
+        os.unlink(upload["path"])
 
 @app.post("/tailor-resume/")
-async def tailor_resume(job_description: JobDescription):
+async def tailor_resume(job_description: JobDescription, profile: str = DEFAULT_PROFILE, timings: bool = False):
     """
     Endpoint to trigger the resume tailoring workflow for a given job description.
+    With timings=true the response includes a per-phase and per-call latency breakdown.
     """
+    validate_profile(profile)
     if not job_description.text:
         raise HTTPException(status_code=400, detail="Job description text cannot be empty.")
 
     try:
-        result = mcp.tailor_resume_workflow(job_description)
+        with request_trace(timings) as trace:
+            result = await get_mcp().tailor_resume_workflow_async(job_description, profile)
+        if trace is not None:
+            result["timings"] = trace.summary()
+        mark_first_response()
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to tailor resume: {e}")
 
+@app.post("/tailor-resume/stream")
+async def tailor_resume_stream(job_description: JobDescription, profile: str = DEFAULT_PROFILE,
+                               timings: bool = False):
+    """
+    Server-Sent-Events variant of /tailor-resume/. Streams phase events, generated
+    tokens and ATS sub-scores as they become available, and with timings=true a
+    final 'timings' event with the latency breakdown.
+    """
+    validate_profile(profile)
+    if not job_description.text:
+        raise HTTPException(status_code=400, detail="Job description text cannot be empty.")
+
+    def event_stream():
+        trace = RequestTrace() if timings else None
+        try:
+            for event, data in iter_traced(get_mcp().tailor_resume_stream(job_description, profile), trace):
+                yield format_sse(event, data)
+            mark_first_response()
+            if trace is not None:
+                yield format_sse("timings", trace.summary())
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Failed to tailor resume: {e}"})
+        yield format_sse("done", {})
+
+    # Sync generators are iterated in a worker thread, so the event loop is not blocked
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/tailor-resume/batch")
+async def tailor_resume_batch(batch: JobDescriptionBatch, profile: str = DEFAULT_PROFILE):
+    """
+    Tailors the master resume against many job descriptions at once. Streams one
+    Server-Sent 'result' event per job (with its index in the request) as each completes.
+    """
+    validate_profile(profile)
+    if not batch.jobs:
+        raise HTTPException(status_code=400, detail="At least one job description is required.")
+    if any(not job.text for job in batch.jobs):
+        raise HTTPException(status_code=400, detail="Job description text cannot be empty.")
+
+    def event_stream():
+        try:
+            for indices, result in get_mcp().tailor_resume_batch(batch.jobs, profile):
+                for index in indices:
+                    yield format_sse("result", {"index": index, **result})
+            mark_first_response()
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Failed to tailor resumes: {e}"})
+        yield format_sse("done", {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ats-score/")
+async def ats_score(request: ATSScoreRequest, timings: bool = False):
+    """
+    Scores a resume against a job description. mode="fast" uses the compiled lexicon
+    and never calls Ollama (suitable for live scoring); mode="llm" runs the full analysis.
+    """
+    if not request.job_description or not request.resume:
+        raise HTTPException(status_code=400, detail="Job description and resume text are required.")
+    if request.mode not in ("fast", "llm"):
+        raise HTTPException(status_code=400, detail="mode must be 'fast' or 'llm'.")
+    try:
+        mcp = get_mcp()
+        with request_trace(timings) as trace:
+            if request.mode == "fast":
+                result = mcp.ats_scorer.calculate_fast_ats_score(request.job_description, request.resume)
+            else:
+                result = await asyncio.to_thread(
+                    mcp.ats_scorer.calculate_ats_score, request.job_description, request.resume, mcp.jd_cache
+                )
+        if trace is not None:
+            result["timings"] = trace.summary()
+        mark_first_response()
+        return JSONResponse(content=result, status_code=200)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to score resume: {e}")
+
+@app.post("/jobs/")
+async def submit_tailor_job(request: TailorJobRequest, profile: str = DEFAULT_PROFILE):
+    """
+    Queues a tailoring run and returns its job ID immediately.
+    Poll /jobs/{job_id} for status and /jobs/{job_id}/result for the output.
+    """
+    validate_profile(profile)
+    if not request.job_description.text:
+        raise HTTPException(status_code=400, detail="Job description text cannot be empty.")
+    try:
+        job_id = await asyncio.to_thread(
+            job_queue.submit, "tailor",
+            {"job_description": request.job_description.model_dump(), "profile": profile},
+            request.priority
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content={"job_id": job_id, "status": "queued"}, status_code=202)
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JSONResponse(content=job, status_code=200)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id, True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to tailor resume: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; no result available.")
+    return JSONResponse(content=job["result"], status_code=200)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    status = await asyncio.to_thread(job_queue.cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JSONResponse(content={"job_id": job_id, "status": status}, status_code=200)
+
+@app.get("/admin/collections")
+async def list_collections():
+    """Lists every per-profile resume collection with its chunk count."""
+    try:
+        collections = await asyncio.to_thread(get_mcp().list_resume_collections)
+        return JSONResponse(content={"collections": collections}, status_code=200)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list collections: {e}")
+
+@app.get("/admin/llm-stats")
+async def llm_stats():
+    """
+    Per-task LLM usage: Ollama's reported token counts and durations, the estimated
+    share of prompt tokens served from the KV cache, prompt-budget trimming and
+    response memo hit rates.
+    """
+    memo = await asyncio.to_thread(lambda: get_memo().stats()) if Config.LLM_MEMO_ENABLED else None
+    return JSONResponse(
+        content={"usage": llm_client.usage_stats(), "prompt_budget": budget_stats(), "memo": memo},
+        status_code=200
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint: phase, LLM, embedding and vector store latency
+    histograms, Ollama's token and duration counters, and cache hit/miss counts.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/warmup")
+async def warmup():
+    """
+    Loads the LLM and embedding models, opens the default collection and runs a tiny
+    query. Returns per-step timings; call it before the first real request.
+    """
+    try:
+        timings = await asyncio.to_thread(run_warmup)
+        return JSONResponse(content={"status": "warm", "timings": timings, **startup_report}, status_code=200)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Warm-up failed: {e}. Is Ollama running and models pulled?")
+
+@app.get("/warmup")
+async def warmup_status():
+    """Time-to-ready, time-to-first-useful-response and the latest warm-up result."""
+    return JSONResponse(content=startup_report, status_code=200)
+
 # If you want a way to check if models are loaded (requires more Ollama API interaction)
 @app.get("/check-ollama-status/")
 async def check_ollama_status():
@@ -101,9 +495,8 @@ async def check_ollama_status():
         # This is a very basic check. A real check would list models.
         # Requires 'ollama' Python library to interact with Ollama API
         import ollama
-        models = ollama.list()
+        models = await asyncio.to_thread(ollama.list)
         # Check if required models are present
-        from config import Config
         required_models = [Config.LLM_MODEL, Config.EMBEDDING_MODEL]
         loaded_models = [m['model'] for m in models.get('models', [])]
         
@@ -1,28 +1,57 @@
-from resume_processor import ResumeProcessor
+import asyncio
+import threading
+import time
+import llm_client
+from config import Config
+from lexicon import get_lexicon
+from metrics import PHASE_SECONDS, in_context, span
+from prompts import SYSTEM_PROMPT
+from resume_processor import ResumeProcessorPool, DEFAULT_PROFILE
 from agents import JobAnalyzerAgent, ContentSynthesizerAgent
 from ats_scorer import ATSScorer
+from jd_cache import JobAnalysisCache
+from task_graph import TaskGraph
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class JobDescription(BaseModel):
     url: Optional[str] = None
     text: str
 
+class JobDescriptionBatch(BaseModel):
+    jobs: list[JobDescription]
+
 class MCPOrcestrator:
     def __init__(self):
-        self.resume_processor = ResumeProcessor()
+        # One lazily opened resume collection per user/profile
+        self.resume_processors = ResumeProcessorPool()
         self.job_analyzer = JobAnalyzerAgent()
         self.content_synthesizer = ContentSynthesizerAgent()
-        self.ats_scorer = ATSScorer()
+        self.ats_scorer = ATSScorer(embed_texts=self.resume_processors.embed_texts)
+        # Analysis of each unique posting is shared by the analyzer and the ATS scorer
+        self.jd_cache = JobAnalysisCache()
+        # Used by the async workflow; llm_client caps in-flight LLM calls across all requests
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        """Ollama's async client, created on first use so importing the backend stays fast."""
+        if self._async_client is None:
+            import ollama
+            self._async_client = ollama.AsyncClient(host=Config.OLLAMA_HOST)
+        return self._async_client
 
-    def ingest_master_resume(self, resume_content: str):
-        """Initial ingestion of the master resume."""
-        self.resume_processor.ingest_resume(resume_content)
+    def ingest_master_resume(self, resume_content: Union[str, Iterable[str]], profile: str = DEFAULT_PROFILE):
+        """Initial ingestion of the master resume, given as text or as an iterable of page texts."""
+        self.resume_processors.get(profile).ingest_resume(resume_content)
         return {"status": "success", "message": "Resume ingested successfully."}
 
-    def tailor_resume_workflow(self, job_desc: JobDescription) -> str:
+    def tailor_resume_workflow(self, job_desc: JobDescription, profile: str = DEFAULT_PROFILE,
+                               cancelled: Optional[threading.Event] = None) -> str:
         """
-        Orchestrates the resume tailoring workflow.
+        Orchestrates the resume tailoring workflow. If `cancelled` is set, no further
+        step starts and concurrent.futures.CancelledError is raised.
         """
         print("\n--- Starting MCP Workflow ---")
         
@@ -35,10 +64,242 @@ class MCPOrcestrator:
         #     if not job_description_text:
         #         return "Error: Could not scrape job description."
 
-        # Phase 1: Analyze Job Description
-        print("MCP: Calling Job Analyzer Agent...")
-        analysis_result = self.job_analyzer.analyze_job_description(job_description_text)
+        def generate(relevant_chunks: list[str]) -> str:
+            print("MCP: Calling Content Synthesizer Agent...")
+            with span(PHASE_SECONDS, phase="generation"):
+                return self.content_synthesizer.generate_tailored_content(job_description_text, relevant_chunks)
+
+        graph = self._workflow_graph(job_description_text, profile,
+                                     analyze=lambda: self._analyze_job(job_description_text), generate=generate)
+        results = graph.run(cancelled)
+        print(f"MCP: Workflow node timings: {self._format_timings(graph)}")
+        print("--- MCP Workflow Complete ---")
         
+        return {
+            "tailored_resume": results["generation"],
+            "ats_score": results["ats_scoring"]
+        }
+
+    async def ingest_master_resume_async(self, resume_content: Union[str, Iterable[str]],
+                                         profile: str = DEFAULT_PROFILE):
+        """
+        Async variant of ingest_master_resume; page extraction (when given a page
+        iterator), embedding and vector store writes run in a worker thread.
+        """
+        return await asyncio.to_thread(self.ingest_master_resume, resume_content, profile)
+
+    async def tailor_resume_workflow_async(self, job_desc: JobDescription, profile: str = DEFAULT_PROFILE) -> dict:
+        """
+        Async variant of tailor_resume_workflow. LLM calls go through Ollama's async
+        client and blocking embedding/ChromaDB/scoring work is off-loaded to threads,
+        so concurrent requests overlap their I/O waits instead of blocking the event loop.
+        """
+        print("\n--- Starting async MCP Workflow ---")
+        job_description_text = job_desc.text
+
+        async def analyze() -> dict:
+            print("MCP: Calling Job Analyzer Agent...")
+            # Phase spans include the wait for an LLM slot, which is part of the latency a request sees
+            with span(PHASE_SECONDS, phase="analysis"):
+                return await self.job_analyzer.analyze_job_description_async(
+                    job_description_text, self.async_client, self.jd_cache
+                )
+
+        async def generate(relevant_chunks: list[str]) -> str:
+            print("MCP: Calling Content Synthesizer Agent...")
+            with span(PHASE_SECONDS, phase="generation"):
+                return await self.content_synthesizer.generate_tailored_content_async(
+                    job_description_text, relevant_chunks, self.async_client
+                )
+
+        # Plain-function nodes (retrieval, ATS scoring) run in worker threads; their LLM
+        # calls share the same process-wide slots in llm_client
+        graph = self._workflow_graph(job_description_text, profile, analyze=analyze, generate=generate)
+        results = await graph.run_async()
+        print(f"MCP: Workflow node timings: {self._format_timings(graph)}")
+        print("--- async MCP Workflow Complete ---")
+        return {
+            "tailored_resume": results["generation"],
+            "ats_score": results["ats_scoring"]
+        }
+
+    def _workflow_graph(self, job_description_text: str, profile: str,
+                        analyze: Callable[[], Any], generate: Callable[[list[str]], Any]) -> TaskGraph:
+        """
+        The tailoring workflow as a dependency graph, shared by the sync and async
+        variants (which differ only in how they call the LLM):
+
+            analysis ──> retrieval ──> generation ──> ats_scoring
+            speculative_retrieval ··> retrieval          ^
+            job_terms ───────────────────────────────────┘
+
+        While the analyzer runs, retrieval is attempted speculatively with the raw
+        job description and the job description's ATS terms are extracted, so
+        neither waits on the analysis. Once the analysis arrives, retrieval uses its
+        skills and responsibilities and cancels the speculative search, or falls
+        back to the speculative result if nothing was extracted.
+        """
+        def retrieve(analysis_result: dict) -> list[str]:
+            if self._build_search_queries(analysis_result):
+                graph.cancel("speculative_retrieval")
+                return self._retrieve_experience(job_description_text, analysis_result, profile)
+            print("MCP: No topics extracted; using retrieval by the full job description.")
+            try:
+                return self._with_retrieval_fallback(graph.result("speculative_retrieval"))
+            except Exception:
+                return self._retrieve_experience(job_description_text, analysis_result, profile)
+
+        def score(tailored_resume_content: str, _job_terms_cached: bool) -> dict:
+            print("MCP: Calculating ATS score...")
+            with span(PHASE_SECONDS, phase="ats_scoring"):
+                return self.ats_scorer.calculate_ats_score(
+                    job_description_text, tailored_resume_content, self.jd_cache
+                )
+
+        graph = TaskGraph("workflow")
+        graph.add("analysis", analyze)
+        graph.add("speculative_retrieval", lambda: self._retrieve_by_text(job_description_text, profile),
+                  speculative=True)
+        graph.add("job_terms", lambda: self.ats_scorer.prefetch_job_terms(job_description_text, self.jd_cache))
+        graph.add("retrieval", retrieve, after=("analysis",))
+        graph.add("generation", generate, after=("retrieval",))
+        graph.add("ats_scoring", score, after=("generation", "job_terms"))
+        return graph
+
+    @staticmethod
+    def _format_timings(graph: TaskGraph) -> str:
+        return ", ".join(
+            f"{name} {timing.get('start_ms', '-')}+{timing.get('ms', '-')}ms ({timing['status']})"
+            for name, timing in graph.timings().items()
+        )
+
+    def tailor_resume_stream(self, job_desc: JobDescription,
+                             profile: str = DEFAULT_PROFILE) -> Iterator[Tuple[str, dict]]:
+        """
+        Streaming variant of tailor_resume_workflow. Yields (event, data) pairs:
+        'analysis' and 'retrieval' when those phases finish, 'token' for each
+        fragment of generated text, 'generation' with the full content,
+        'ats_subscore' for each ATS sub-score as it finishes, and finally 'ats_score'.
+        """
+        print("\n--- Starting MCP Streaming Workflow ---")
+        job_description_text = job_desc.text
+
+        analysis_result = self._analyze_job(job_description_text)
+        yield "analysis", analysis_result
+
+        relevant_chunks = self._retrieve_experience(job_description_text, analysis_result, profile)
+        yield "retrieval", {"chunks": relevant_chunks}
+
+        print("MCP: Streaming Content Synthesizer Agent...")
+        parts = []
+        with span(PHASE_SECONDS, phase="generation"):
+            for token in self.content_synthesizer.stream_tailored_content(job_description_text, relevant_chunks):
+                parts.append(token)
+                yield "token", {"text": token}
+        tailored_resume_content = "".join(parts)
+        yield "generation", {"tailored_resume": tailored_resume_content}
+
+        print("MCP: Calculating ATS score...")
+        with span(PHASE_SECONDS, phase="ats_scoring"):
+            for name, value in self.ats_scorer.iter_ats_score(
+                job_description_text, tailored_resume_content, self.jd_cache
+            ):
+                if name == "ats_score":
+                    yield "ats_score", value
+                else:
+                    yield "ats_subscore", {"name": name, "value": value}
+
+        print("--- MCP Streaming Workflow Complete ---")
+
+    def warm_up(self, profile: str = DEFAULT_PROFILE) -> dict:
+        """
+        Loads the embedding model and the LLM into Ollama, opens the profile's vector
+        store and runs a tiny retrieval and a one-token chat, so the first real request
+        does not pay for model loading. Returns the time each step took in milliseconds.
+        """
+        import ollama
+        timings = {}
+
+        started = time.perf_counter()
+        get_lexicon()
+        timings["lexicon_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Called directly rather than through the embedding cache, which could skip loading the model
+        started = time.perf_counter()
+        ollama.embed(model=Config.EMBEDDING_MODEL, input=["warm-up"], keep_alive=llm_client.keep_alive())
+        timings["embedding_model_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        processor = self.resume_processors.get(profile)
+        if processor.store.count():
+            processor.retrieve_relevant_experience("warm-up", n_results=1)
+        timings["vector_store_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Same num_ctx as real calls (Ollama reloads the model when it changes), and the
+        # shared system prompt so its KV cache is already populated
+        started = time.perf_counter()
+        llm_client.chat(
+            self.job_analyzer.model, "warmup",
+            [{'role': 'system', 'content': SYSTEM_PROMPT}, {'role': 'user', 'content': "Reply with OK."}],
+            {'num_ctx': Config.LLM_NUM_CTX, 'num_predict': 1},
+            memoize=False
+        )
+        timings["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        timings["total_ms"] = round(sum(timings.values()), 1)
+        print(f"MCP: Warm-up complete: {timings}")
+        return timings
+
+    def list_resume_collections(self) -> list[dict]:
+        """Sizes of every stored per-profile resume collection."""
+        return self.resume_processors.list_collections()
+
+    def _analyze_job(self, job_description_text: str) -> dict:
+        print("MCP: Calling Job Analyzer Agent...")
+        with span(PHASE_SECONDS, phase="analysis"):
+            return self.job_analyzer.analyze_job_description(job_description_text, self.jd_cache)
+
+    def _retrieve_experience(self, job_description_text: str, analysis_result: dict,
+                             profile: str = DEFAULT_PROFILE) -> list[str]:
+        processor = self.resume_processors.get(profile)
+        search_queries = self._build_search_queries(analysis_result)
+
+        print("MCP: Retrieving relevant experience from the vector store...")
+        where = self._section_filter()
+        with span(PHASE_SECONDS, phase="retrieval"):
+            if Config.RETRIEVAL_MODE == "multi_query" and search_queries:
+                relevant_chunks = processor.retrieve_multi_query(search_queries, where=where)
+                if not relevant_chunks and where:
+                    relevant_chunks = processor.retrieve_multi_query(search_queries)
+            else:
+                search_query = self._build_search_query(job_description_text, analysis_result)
+                relevant_chunks = processor.retrieve_relevant_experience(search_query, where=where)
+                if not relevant_chunks and where:
+                    relevant_chunks = processor.retrieve_relevant_experience(search_query)
+        return self._with_retrieval_fallback(relevant_chunks)
+
+    def _retrieve_by_text(self, job_description_text: str, profile: str = DEFAULT_PROFILE) -> list[str]:
+        """Retrieval with the whole job description as the query; needs no analysis."""
+        processor = self.resume_processors.get(profile)
+        where = self._section_filter()
+        with span(PHASE_SECONDS, phase="speculative_retrieval"):
+            relevant_chunks = processor.retrieve_relevant_experience(job_description_text, where=where)
+            if not relevant_chunks and where:
+                relevant_chunks = processor.retrieve_relevant_experience(job_description_text)
+        return relevant_chunks
+
+    def _section_filter(self) -> Optional[dict]:
+        """Metadata filter restricting retrieval to Config.RETRIEVAL_SECTIONS, or None to search every section."""
+        if not Config.RETRIEVAL_SECTIONS:
+            return None
+        return {"section": {"$in": Config.RETRIEVAL_SECTIONS}}
+
+    def _build_search_queries(self, analysis_result: dict) -> list[str]:
+        """One query per extracted skill and responsibility, for multi-query retrieval."""
+        topics = analysis_result.get("skills", []) + analysis_result.get("responsibilities", [])
+        return list(dict.fromkeys(topic.strip() for topic in topics if isinstance(topic, str) and topic.strip()))
+
+    def _build_search_query(self, job_description_text: str, analysis_result: dict) -> str:
         extracted_skills = analysis_result.get("skills", [])
         extracted_responsibilities = analysis_result.get("responsibilities", [])
         
@@ -47,30 +308,76 @@ class MCPOrcestrator:
         if not search_query:
             print("Warning: No skills or responsibilities extracted. Using generic search.")
             search_query = job_description_text[:100] # Use a part of the job description
+        return search_query
 
-        # Phase 2: Retrieve Relevant Experience
-        print("MCP: Retrieving relevant experience from ChromaDB...")
-        relevant_chunks = self.resume_processor.retrieve_relevant_experience(search_query)
-        
+    def _with_retrieval_fallback(self, relevant_chunks: list[str]) -> list[str]:
         if not relevant_chunks:
             print("Warning: No relevant resume chunks found. Generating content with limited context.")
             # Fallback: if no relevant chunks, provide original resume content if available (not implemented here)
             # Or inform the user.
             relevant_chunks = ["No specific relevant experience found in your master resume for this job based on extracted keywords. Please ensure your master resume is comprehensive or try adjusting the job description."]
+        return relevant_chunks
 
-        # Phase 3: Synthesize and Generate Tailored Content
-        print("MCP: Calling Content Synthesizer Agent...")
-        tailored_resume_content = self.content_synthesizer.generate_tailored_content(
-            job_description_text,
-            relevant_chunks
-        )
-        
-        # Phase 4: Calculate ATS Score
-        print("MCP: Calculating ATS score...")
-        ats_results = self.ats_scorer.calculate_ats_score(job_description_text, tailored_resume_content)
-        
-        print("--- MCP Workflow Complete ---")
-        
+    def tailor_resume_batch(self, job_descs: list[JobDescription],
+                            profile: str = DEFAULT_PROFILE) -> Iterator[Tuple[list[int], dict]]:
+        """
+        Tailors the master resume against many job descriptions. Identical postings
+        are processed once, retrieval for all postings uses one batched embedding
+        call and one ChromaDB query, and the LLM phases are scheduled on a bounded
+        worker pool. Yields (indices into job_descs, result) as each posting completes.
+        """
+        print(f"\n--- Starting MCP Batch Workflow for {len(job_descs)} jobs ---")
+        indices_by_key = {}
+        unique_texts = []
+        for index, job_desc in enumerate(job_descs):
+            key = self.jd_cache.make_key(job_desc.text)
+            if key not in indices_by_key:
+                indices_by_key[key] = []
+                unique_texts.append(job_desc.text)
+            indices_by_key[key].append(index)
+        unique_indices = list(indices_by_key.values())
+        print(f"MCP: {len(unique_texts)} unique job descriptions.")
+
+        with ThreadPoolExecutor(max_workers=max(1, Config.OLLAMA_MAX_PARALLEL),
+                                thread_name_prefix="batch") as executor:
+            analyses = list(executor.map(in_context(self._analyze_job), unique_texts))
+
+            print("MCP: Retrieving relevant experience for all jobs...")
+            processor = self.resume_processors.get(profile)
+            with span(PHASE_SECONDS, phase="retrieval"):
+                if Config.RETRIEVAL_MODE == "multi_query":
+                    # Postings without extracted topics fall back to a single query built from their text
+                    query_groups = [self._build_search_queries(analysis) or [self._build_search_query(text, analysis)]
+                                    for text, analysis in zip(unique_texts, analyses)]
+                    retrieved = processor.retrieve_multi_query_batch(query_groups, where=self._section_filter())
+                else:
+                    search_queries = [self._build_search_query(text, analysis)
+                                      for text, analysis in zip(unique_texts, analyses)]
+                    retrieved = processor.retrieve_relevant_experience_batch(search_queries, where=self._section_filter())
+
+            futures = {
+                executor.submit(in_context(self._synthesize_and_score), text, self._with_retrieval_fallback(chunks)): indices
+                for text, chunks, indices in zip(unique_texts, retrieved, unique_indices)
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": f"Failed to tailor resume: {e}"}
+                yield futures[future], result
+
+        print("--- MCP Batch Workflow Complete ---")
+
+    def _synthesize_and_score(self, job_description_text: str, relevant_chunks: list[str]) -> dict:
+        with span(PHASE_SECONDS, phase="generation"):
+            tailored_resume_content = self.content_synthesizer.generate_tailored_content(
+                job_description_text,
+                relevant_chunks
+            )
+        with span(PHASE_SECONDS, phase="ats_scoring"):
+            ats_results = self.ats_scorer.calculate_ats_score(
+                job_description_text, tailored_resume_content, self.jd_cache
+            )
         return {
             "tailored_resume": tailored_resume_content,
             "ats_score": ats_results
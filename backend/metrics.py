@@ -0,0 +1,228 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds: embedding/vector calls sit at the low end, LLM calls at the high end
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _label_values(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _format_labels(self, values: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.label_names, values)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount <= 0:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{self._format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: (non-cumulative bucket counts + overflow, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = {key: (list(series[0]), series[1], series[2]) for key, series in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+PHASE_SECONDS = Histogram("careerpilot_phase_seconds", "Duration of workflow phases.", ("phase",))
+LLM_SECONDS = Histogram("careerpilot_llm_request_seconds", "Wall time of LLM chat calls.", ("task", "cached"))
+LLM_TOKENS = Counter("careerpilot_llm_tokens_total", "Tokens Ollama reported evaluating.", ("task", "kind"))
+LLM_DURATION_SECONDS = Counter(
+    "careerpilot_llm_duration_seconds_total", "Time Ollama reported spending per stage.", ("task", "stage")
+)
+EMBEDDING_SECONDS = Histogram("careerpilot_embedding_request_seconds", "Wall time of embedding calls.", ("call",))
+EMBEDDING_TEXTS = Counter("careerpilot_embedded_texts_total", "Texts sent to the embedding model.")
+VECTOR_STORE_SECONDS = Histogram(
+    "careerpilot_vector_store_seconds", "Duration of vector store operations.", ("operation", "backend")
+)
+CACHE_REQUESTS = Counter("careerpilot_cache_requests_total", "Cache lookups by outcome.", ("cache", "result"))
+WORKFLOW_NODE_SECONDS = Histogram(
+    "careerpilot_workflow_node_seconds", "Duration of workflow graph nodes by outcome.", ("node", "status")
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """Spans recorded while handling one request, for the optional per-request timing breakdown."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict):
+        with self._lock:
+            self.spans.append(record)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            spans = list(self.spans)
+        phases = {}
+        for record in spans:
+            if "phase" in record:
+                phases[record["phase"]] = round(phases.get(record["phase"], 0.0) + record["ms"], 1)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "phases": phases,
+            "spans": spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+@contextmanager
+def request_trace(enabled: bool = True) -> Iterator[Optional[RequestTrace]]:
+    """Collects every span recorded in this context (and contexts copied from it) while active."""
+    if not enabled:
+        yield None
+        return
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(histogram: Histogram, **labels) -> Iterator[Dict]:
+    """
+    Times the enclosed block into `histogram` under `labels`. The yielded dict can be
+    given extra attributes (token counts, cache hits) that only go into the request trace,
+    or have its labels updated before the block ends.
+    """
+    record = {"span": _span_name(histogram), **labels}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        # Labels are read back from the record so the block can refine them (e.g. cached="true")
+        _observe(histogram, record, started, time.perf_counter())
+
+
+def record_span(histogram: Histogram, started: float, finished: float, **labels) -> Dict:
+    """Records a span timed elsewhere (perf_counter start and end), as span() would have."""
+    record = {"span": _span_name(histogram), **labels}
+    _observe(histogram, record, started, finished)
+    return record
+
+
+def _span_name(histogram: Histogram) -> str:
+    return histogram.name.replace("careerpilot_", "").replace("_seconds", "")
+
+
+def _observe(histogram: Histogram, record: Dict, started: float, finished: float):
+    elapsed = finished - started
+    histogram.observe(elapsed, **record)
+    trace = _current_trace.get()
+    if trace is not None:
+        # Start offsets show which spans overlapped
+        record["start_ms"] = round((started - trace.started) * 1000, 1)
+        record["ms"] = round(elapsed * 1000, 1)
+        trace.add(record)
+
+
+def iter_traced(iterator: Iterator, trace: Optional[RequestTrace]) -> Iterator:
+    """
+    Yields from `iterator` with `trace` active during each step. Streaming responses
+    resume their generator from a fresh context copy every time, so a trace entered
+    inside the generator would not survive from one step to the next.
+    """
+    while True:
+        token = _current_trace.set(trace)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current_trace.reset(token)
+        yield item
+
+
+def in_context(func: Callable) -> Callable:
+    """
+    Binds func to a copy of the current context, so spans recorded on executor
+    threads still reach the submitting request's trace. Each call runs in its own
+    copy, so the wrapper is safe to use with executor.map.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
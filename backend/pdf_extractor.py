@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from typing import Iterator, Optional, Tuple
+from config import Config
+
+# --- Worker side ------------------------------------------------------------
+# Each worker keeps the last document it opened, so the pages of one upload it
+# is handed do not each re-parse the file's cross-reference table.
+_reader = None
+_reader_key: Optional[Tuple[str, int, int]] = None
+
+def _open(path: str):
+    global _reader, _reader_key
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key != _reader_key:
+        import PyPDF2
+        _reader, _reader_key = PyPDF2.PdfReader(path), key
+    return _reader
+
+def _page_count(path: str) -> int:
+    return len(_open(path).pages)
+
+def _extract_page(path: str, index: int) -> str:
+    return _open(path).pages[index].extract_text() or ""
+
+
+# --- Pool -------------------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """The shared extraction pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the backend runs threads (uvicorn, ChromaDB) that fork does not copy safely
+            _pool = multiprocessing.get_context("spawn").Pool(processes=Config.PDF_WORKERS)
+            print(f"Started PDF extraction pool with {Config.PDF_WORKERS} workers.")
+        return _pool
+
+def _restart_pool(stale):
+    """Replaces `stale` (if still current) so a worker stuck on a page stops holding a slot."""
+    global _pool
+    with _pool_lock:
+        if _pool is stale:
+            stale.terminate()
+            _pool = None
+    return _get_pool()
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+# --- Extraction -------------------------------------------------------------
+
+def iter_pdf_pages(path: str, timeout: float = Config.PDF_PAGE_TIMEOUT_SECONDS) -> Iterator[str]:
+    """
+    Yields the text of each page of the PDF at `path`, in order. Pages are extracted
+    in a process pool, a few ahead of the consumer, so a large document neither
+    holds the GIL nor sits in memory all at once. A page that takes longer than
+    `timeout` seconds is skipped. With PDF_WORKERS=0 pages are extracted in the
+    calling thread instead.
+    """
+    if Config.PDF_WORKERS <= 0:
+        yield from _iter_pages_inline(path)
+        return
+    try:
+        pool = _get_pool()
+        page_count = pool.apply_async(_page_count, (path,)).get(timeout)
+    except multiprocessing.TimeoutError:
+        raise Exception(f"Timed out opening the PDF after {timeout}s")
+    except (OSError, RuntimeError) as e:
+        print(f"PDF extraction pool unavailable ({e}); extracting in-process.")
+        yield from _iter_pages_inline(path)
+        return
+
+    window = Config.PDF_WORKERS * 2
+    pending = deque()
+    next_page = 0
+    while next_page < page_count or pending:
+        while next_page < page_count and len(pending) < window:
+            pending.append((next_page, pool.apply_async(_extract_page, (path, next_page))))
+            next_page += 1
+
+        index, result = pending[0]
+        try:
+            text = result.get(timeout)
+        except multiprocessing.TimeoutError:
+            # Restarting drops every queued page, so whatever is left is resubmitted to the new pool.
+            # If another extraction already restarted the pool, this page was lost rather than slow.
+            if _pool is pool:
+                print(f"PDF extraction: page {index + 1} timed out after {timeout}s; skipping it.")
+                pending.popleft()
+            pool = _restart_pool(pool)
+            pending = deque((i, pool.apply_async(_extract_page, (path, i))) for i, _ in pending)
+            continue
+        except Exception as e:
+            print(f"PDF extraction: could not extract page {index + 1}: {e}")
+            text = ""
+        pending.popleft()
+        yield text
+
+def _iter_pages_inline(path: str) -> Iterator[str]:
+    import PyPDF2
+    for page in PyPDF2.PdfReader(path).pages:
+        yield page.extract_text() or ""
@@ -0,0 +1,209 @@
+import math
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+from config import Config
+from lexicon import STOPWORDS, get_lexicon, tokenize
+
+# Words split into pieces of up to four characters plus punctuation: close to what
+# BPE tokenizers produce for English text, without loading a tokenizer
+TOKEN_ESTIMATE_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+WORD_PATTERN = re.compile(r"\S+")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?;])\s+")
+
+# Output tokens reserved (num_predict) per task
+TASK_NUM_PREDICT = {
+    "job_analysis": 384,
+    "synthesis": 1024,
+    "term_extraction": 512,
+    "list_extraction": 256,
+    "experience_relevance": 200,
+    "detailed_analysis": 512,
+}
+
+# Room left for chat-template tokens and estimation error
+SAFETY_MARGIN_TOKENS = 64
+# Lines longer than this are split into sentences so they can be trimmed individually
+MAX_UNIT_TOKENS = 80
+MIN_SECTION_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_ESTIMATE_PATTERN.findall(text))
+
+
+class Section(NamedTuple):
+    text: str
+    weight: float = 1.0
+    # Text to rank this section's lines against; None ranks them by lexicon skill/keyword hits
+    query: Optional[str] = None
+
+
+class PromptBudget:
+    """
+    Fits variable prompt sections into the model's context window. Each section gets
+    a share of the tokens left after the template and the reserved output; sections
+    that need less than their share hand the rest to the others. Oversized sections
+    are trimmed line by line, keeping the lines most relevant to the section's query.
+    """
+
+    def __init__(self, task: str, num_ctx: Optional[int] = None):
+        self.task = task
+        self.num_ctx = num_ctx or Config.LLM_NUM_CTX
+        self.num_predict = TASK_NUM_PREDICT[task]
+
+    def options(self, temperature: float) -> Dict:
+        """Ollama options bounding the KV cache and the output length for this task."""
+        return {'temperature': temperature, 'num_ctx': self.num_ctx, 'num_predict': self.num_predict}
+
+    def fit(self, template: str, **sections: Section) -> Dict[str, str]:
+        """
+        Returns the section texts trimmed to fit. `template` is the prompt rendered
+        with every section empty, used to account for the fixed instructions.
+        """
+        available = self.num_ctx - self.num_predict - SAFETY_MARGIN_TOKENS - estimate_tokens(template)
+
+        sizes = {name: estimate_tokens(section.text) for name, section in sections.items()}
+        budgets = self._allocate(sizes, {name: section.weight for name, section in sections.items()}, available)
+
+        fitted = {}
+        dropped = 0
+        for name, section in sections.items():
+            if sizes[name] <= budgets[name]:
+                fitted[name] = section.text
+                continue
+            fitted[name] = trim_section(section, budgets[name])
+            kept = estimate_tokens(fitted[name])
+            dropped += sizes[name] - kept
+            print(f"Prompt budget ({self.task}): trimmed '{name}' from ~{sizes[name]} to ~{kept} tokens.")
+        _record(self.task, sum(sizes.values()), dropped)
+        return fitted
+
+    def fit_items(self, template: str, items: List[str], render: Callable[[str], str] = lambda item: item) -> List[str]:
+        """
+        Fits an ordered list of items (e.g. retrieved chunks, best first) as the prompt's
+        only variable part. Leading items are kept whole; the first one that does not
+        fit is cut short to the room left and the rest are dropped, so every item stays
+        one item however many lines it has. `render` gives an item's text as it will
+        appear in the prompt, for counting.
+        """
+        available = max(self.num_ctx - self.num_predict - SAFETY_MARGIN_TOKENS - estimate_tokens(template),
+                        MIN_SECTION_TOKENS)
+        sizes = [estimate_tokens(render(item)) for item in items]
+        fitted, used = [], 0
+        for item, size in zip(items, sizes):
+            if used + size <= available:
+                fitted.append(item)
+                used += size
+                continue
+            room = available - used - estimate_tokens(render(""))
+            truncated = truncate_text(item, room) if room >= MIN_SECTION_TOKENS or not fitted else ""
+            if truncated:
+                fitted.append(truncated)
+            break
+        total = sum(sizes)
+        dropped = total - sum(estimate_tokens(render(item)) for item in fitted)
+        if dropped:
+            print(f"Prompt budget ({self.task}): kept {len(fitted)} of {len(items)} items, ~{total - dropped} of ~{total} tokens.")
+        _record(self.task, total, dropped)
+        return fitted
+
+    @staticmethod
+    def _allocate(sizes: Dict[str, int], weights: Dict[str, float], available: int) -> Dict[str, int]:
+        """Weighted water-filling: small sections take what they need, the rest is shared by weight."""
+        budgets = {}
+        pending = dict(sizes)
+        remaining = max(available, MIN_SECTION_TOKENS * len(sizes))
+        while pending:
+            total_weight = sum(weights[name] for name in pending) or 1.0
+            shares = {name: remaining * weights[name] / total_weight for name in pending}
+            satisfied = [name for name in pending if pending[name] <= shares[name]]
+            if not satisfied:
+                for name in pending:
+                    budgets[name] = max(int(shares[name]), MIN_SECTION_TOKENS)
+                break
+            for name in satisfied:
+                budgets[name] = pending.pop(name)
+                remaining -= budgets[name]
+        return budgets
+
+
+def trim_section(section: Section, budget: int) -> str:
+    """Trims a section to `budget` tokens, keeping its most relevant lines in document order."""
+    units = _split_units(section.text)
+    scores = _relevance_scores(units, section.query)
+    # Ties keep document order
+    ranking = sorted(range(len(units)), key=lambda i: (-scores[i], i))
+
+    kept, used = set(), 0
+    for i in ranking:
+        cost = estimate_tokens(units[i]) + 1
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+    if not kept and ranking:
+        # Not even the best line fits: keep as many of its words as the budget allows
+        return truncate_text(units[ranking[0]], budget)
+    return "\n".join(units[i] for i in sorted(kept))
+
+
+def truncate_text(text: str, budget: int) -> str:
+    """The longest prefix of `text` ending at a word boundary that fits in `budget` tokens."""
+    ends = [match.end() for match in WORD_PATTERN.finditer(text)]
+    low, high = 0, len(ends)
+    # Binary search for the number of leading words that fit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:ends[middle - 1]]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:ends[low - 1]] if low else ""
+
+
+def _split_units(text: str) -> List[str]:
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) > MAX_UNIT_TOKENS:
+            units.extend(sentence for sentence in SENTENCE_SPLIT_PATTERN.split(line) if sentence.strip())
+        else:
+            units.append(line)
+    return units
+
+
+def _content_tokens(text: str) -> List[str]:
+    return [token for token in tokenize(text) if len(token) > 2 and token not in STOPWORDS]
+
+
+def _relevance_scores(units: List[str], query: Optional[str]) -> List[float]:
+    if query is None:
+        lexicon = get_lexicon()
+        return [float(sum(sum(counts.values()) for counts in lexicon.scan(unit).values())) for unit in units]
+    query_tokens = set(_content_tokens(query))
+    scores = []
+    for unit in units:
+        tokens = _content_tokens(unit)
+        overlap = sum(1 for token in tokens if token in query_tokens)
+        # Normalized so long lines do not win on length alone
+        scores.append(overlap / math.sqrt(len(tokens)) if tokens else 0.0)
+    return scores
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _record(task: str, tokens: int, dropped: int):
+    with _stats_lock:
+        stats = _stats.setdefault(task, {"prompts": 0, "trimmed_prompts": 0, "section_tokens": 0, "dropped_tokens": 0})
+        stats["prompts"] += 1
+        stats["trimmed_prompts"] += 1 if dropped else 0
+        stats["section_tokens"] += tokens
+        stats["dropped_tokens"] += dropped
+
+def budget_stats() -> Dict[str, Dict[str, int]]:
+    """Per-task counts of fitted prompts and how many section tokens were trimmed."""
+    with _stats_lock:
+        return {task: dict(stats) for task, stats in _stats.items()}
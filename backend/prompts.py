@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Dict, List
+from config import Config
+from prompt_budget import Section, estimate_tokens, trim_section
+
+# Identical for every call, so it heads the shared prefix Ollama can reuse from its KV cache
+SYSTEM_PROMPT = (
+    "You are an expert HR analyst, ATS specialist and professional resume writer. "
+    "You help a candidate tailor their resume to the job description provided at the "
+    "start of each request. Follow the task instructions that come after the job "
+    "description exactly, and when asked for JSON, output only JSON."
+)
+
+
+@lru_cache(maxsize=64)
+def job_prefix(job_description: str) -> str:
+    """
+    The job description block every prompt starts with. It is trimmed once to a
+    fixed budget (not per task), so all calls about one posting share the same
+    prefix tokens and only their task-specific suffix needs evaluating.
+    """
+    text = job_description.strip()
+    if estimate_tokens(text) > Config.JOB_PREFIX_MAX_TOKENS:
+        text = trim_section(Section(text), Config.JOB_PREFIX_MAX_TOKENS)
+        print(f"Prompts: trimmed job description prefix to ~{Config.JOB_PREFIX_MAX_TOKENS} tokens.")
+    return f"JOB DESCRIPTION:\n---\n{text}\n---\n\n"
+
+
+def build_messages(job_description: str, task_prompt: str) -> List[Dict[str, str]]:
+    """Chat messages laid out as: shared system prompt, job description, then the task."""
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': job_prefix(job_description) + task_prompt.strip() + "\n"},
+    ]
+
+
+def messages_text(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(message['content'] for message in messages)
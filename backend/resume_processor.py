@@ -1,103 +1,354 @@
-import ollama
-import chromadb
-from chromadb.utils import embedding_functions
+import hashlib
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional, Union
 from config import Config
+from embedding_cache import CachedEmbedder
+from chunker import CHUNKER_VERSION, ResumeChunk, ResumeChunker
+from vector_store import count_vector_collection, create_vector_store, list_vector_collections
+from metrics import PHASE_SECONDS, VECTOR_STORE_SECONDS, in_context, span
+
+DEFAULT_PROFILE = "default"
+# Starts and ends with a letter or digit, as ChromaDB requires of collection names
+PROFILE_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,46}[A-Za-z0-9])?$")
+DEFAULT_COLLECTION = "resume_collection"
+# Prefix of every other profile's collection; it cannot produce DEFAULT_COLLECTION for any profile name
+PROFILE_COLLECTION_PREFIX = "resume_profile_"
+
+def collection_name_for(profile: str) -> str:
+    """Maps a user/profile name to its collection; the default profile keeps the original collection."""
+    if profile == DEFAULT_PROFILE:
+        return DEFAULT_COLLECTION
+    if not PROFILE_PATTERN.match(profile):
+        raise ValueError("Profile names must be 1-48 letters, digits, '-' or '_', "
+                         "starting and ending with a letter or digit.")
+    return f"{PROFILE_COLLECTION_PREFIX}{profile}"
+
+def profile_for_collection(collection_name: str) -> Optional[str]:
+    """Inverse of collection_name_for; None for collections that do not belong to a profile."""
+    if collection_name == DEFAULT_COLLECTION:
+        return DEFAULT_PROFILE
+    if collection_name.startswith(PROFILE_COLLECTION_PREFIX):
+        return collection_name[len(PROFILE_COLLECTION_PREFIX):]
+    return None
 
 class ResumeProcessor:
-    def __init__(self, db_path: str = Config.CHROMA_DB_PATH, 
-                 collection_name: str = "resume_collection"):
-        self.client = chromadb.PersistentClient(path=db_path)
-        # ChromaDB can use an Ollama embedding function
-        # Note: This might require specific ChromaDB versions or configurations.
-        # For simplicity and direct control, we will use Ollama's `generate_embeddings` directly.
-        
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name
-        )
-        print(f"Initialized ChromaDB client at {db_path} with collection '{collection_name}'")
+    def __init__(self, collection_name: str = DEFAULT_COLLECTION,
+                 embedder: Optional[CachedEmbedder] = None):
+        # Embeddings are generated with Ollama directly; the store only persists and searches them.
+        # Backend (ChromaDB or the NumPy memory-mapped store) is selected via Config.VECTOR_STORE_BACKEND.
+        self.store = create_vector_store(collection_name)
+        self.embedder = embedder or CachedEmbedder()
+        self.chunker = ResumeChunker()
+
+    def _chunk_resume(self, resume_content: Union[str, Iterable[str]]) -> list[ResumeChunk]:
+        """
+        Breaks down the resume content (text, or an iterable of page texts) into
+        section-tagged chunks, joining wrapped lines and dropping headers, dates
+        and near-duplicates.
+        """
+        if isinstance(resume_content, str):
+            return self.chunker.chunk(resume_content)
+        return self.chunker.chunk_pages(resume_content)
+
+    @staticmethod
+    def _chunk_id(chunk: ResumeChunk) -> str:
+        """Stable, content-derived ID so unchanged chunks keep their ID across uploads."""
+        key = f"{chunk.section}\x00{chunk.role}\x00{chunk.text}"
+        return f"resume_chunk_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}"
 
-    def _chunk_resume(self, resume_content: str) -> list[str]:
+    def _requires_rebuild(self, existing_metadatas: list) -> bool:
         """
-        Breaks down the resume content into smaller, meaningful chunks.
-        This is a basic example; more sophisticated chunking could use NLP libraries.
+        Stored vectors are only comparable with new ones if they came from the same
+        embedding model; any other model (or legacy chunks without the metadata)
+        may have a different dimension, so the whole collection must be rebuilt.
+        Chunks from an older chunker are rebuilt too (their embeddings come from the cache).
         """
-        # Simple chunking by lines/bullet points for demonstration
-        chunks = [line.strip() for line in resume_content.split('\n') if line.strip()]
-        # Filter out very short or non-informative lines
-        chunks = [chunk for chunk in chunks if len(chunk) > 10] 
-        return chunks
+        for metadata in existing_metadatas:
+            stored_model = (metadata or {}).get('embedding_model')
+            if stored_model != Config.EMBEDDING_MODEL:
+                print(f"Embedding model changed ({stored_model} -> {Config.EMBEDDING_MODEL}).")
+                return True
+            if (metadata or {}).get('chunker') != CHUNKER_VERSION:
+                print(f"Chunker changed; rebuilding with '{CHUNKER_VERSION}'.")
+                return True
+        return False
 
-    def ingest_resume(self, resume_content: str):
+    def ingest_resume(self, resume_content: Union[str, Iterable[str]]):
         """
-        Ingests the master resume: chunks it, embeds it, and stores it in ChromaDB.
+        Ingests the master resume: chunks it, embeds it, and stores it in the vector store.
+        Re-ingesting only embeds new or changed chunks and deletes removed ones.
+        resume_content may be an iterable of page texts, which is chunked as it is consumed.
         """
         print("Starting resume ingestion...")
-        chunks = self._chunk_resume(resume_content)
+        with span(PHASE_SECONDS, phase="chunking"):
+            chunks = self._chunk_resume(resume_content)
         print(f"Chunked resume into {len(chunks)} pieces.")
+        if not chunks:
+            # Otherwise every stored chunk would be deleted as stale
+            raise ValueError("The uploaded file appears to be empty or could not be processed.")
 
-        # Clear existing data and recreate collection to avoid dimension issues
-        try:
-            self.client.delete_collection(name=self.collection.name)
-            print("Deleted existing collection.")
-        except Exception as e:
-            print(f"Could not delete collection (might not exist): {e}")
-        
-        # Recreate collection
-        self.collection = self.client.create_collection(name=self.collection.name)
-        print(f"Recreated collection '{self.collection.name}'")
-
-        embeddings_data = []
-        documents_to_add = []
-        ids_to_add = []
-
-        for i, chunk in enumerate(chunks):
-            try:
-                # Use ollama embeddings
-                response = ollama.embeddings(model=Config.EMBEDDING_MODEL, prompt=chunk)
-                if 'embedding' in response:
-                    embeddings_data.append(response['embedding'])
-                    documents_to_add.append(chunk)
-                    ids_to_add.append(f"resume_chunk_{i}")
-                else:
-                    print(f"Warning: No embedding found for chunk {i}. Skipping.")
-            except Exception as e:
-                print(f"Error generating embedding for chunk {i}: {e}")
-        
-        if documents_to_add:
-            print(f"Adding {len(documents_to_add)} documents to ChromaDB.")
-            self.collection.add(
-                documents=documents_to_add,
-                embeddings=embeddings_data,
-                ids=ids_to_add
-            )
-            print("Resume ingestion complete.")
+        # Identical chunks collapse onto the same content-hash ID
+        chunks_by_id = {}
+        for chunk in chunks:
+            chunks_by_id.setdefault(self._chunk_id(chunk), chunk)
+
+        with span(VECTOR_STORE_SECONDS, operation="get", backend=Config.VECTOR_STORE_BACKEND):
+            existing = self.store.get(include=['metadatas'])
+        existing_ids = existing.get('ids') or []
+        if existing_ids and self._requires_rebuild(existing.get('metadatas') or []):
+            self.store.reset()
+            existing_ids = []
+
+        stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in chunks_by_id]
+        if stale_ids:
+            with span(VECTOR_STORE_SECONDS, operation="delete", backend=Config.VECTOR_STORE_BACKEND):
+                self.store.delete(ids=stale_ids)
+            print(f"Deleted {len(stale_ids)} chunks no longer in the resume.")
+
+        existing_id_set = set(existing_ids)
+        new_chunks = [(chunk_id, chunk) for chunk_id, chunk in chunks_by_id.items()
+                      if chunk_id not in existing_id_set]
+        print(f"{len(chunks_by_id) - len(new_chunks)} chunks unchanged, {len(new_chunks)} to embed.")
+
+        batch_size = max(1, Config.EMBEDDING_BATCH_SIZE)
+        batches = [
+            new_chunks[start:start + batch_size]
+            for start in range(0, len(new_chunks), batch_size)
+        ]
+        print(f"Embedding {len(new_chunks)} chunks in {len(batches)} batches.")
+
+        added = 0
+        with span(PHASE_SECONDS, phase="embedding"), \
+                ThreadPoolExecutor(max_workers=max(1, Config.EMBEDDING_WORKERS)) as executor:
+            for embedded in executor.map(in_context(self._embed_batch), batches):
+                if not embedded:
+                    continue
+                with span(VECTOR_STORE_SECONDS, operation="add", backend=Config.VECTOR_STORE_BACKEND):
+                    self.store.add(
+                        documents=[chunk.text for _, chunk, _ in embedded],
+                        embeddings=[embedding for _, _, embedding in embedded],
+                        metadatas=[{
+                            'embedding_model': Config.EMBEDDING_MODEL,
+                            'chunker': CHUNKER_VERSION,
+                            'section': chunk.section,
+                            'role': chunk.role
+                        } for _, chunk, _ in embedded],
+                        ids=[chunk_id for chunk_id, _, _ in embedded]
+                    )
+                added += len(embedded)
+
+        if added:
+            print(f"Added {added} documents to the vector store.")
+        elif not new_chunks and chunks_by_id:
+            print("Resume unchanged; nothing to embed.")
         else:
-            print("No valid chunks or embeddings to add to ChromaDB.")
+            print("No valid chunks or embeddings to add to the vector store.")
+        print(f"Embedding cache: {self.embedder.cache.stats()}")
+        print("Resume ingestion complete.")
 
-    def retrieve_relevant_experience(self, query_text: str, n_results: int = 5) -> list[str]:
+    def _embed_batch(self, batch: list[tuple[str, ResumeChunk]]) -> list[tuple[str, ResumeChunk, list[float]]]:
         """
-        Queries ChromaDB to find the most relevant resume chunks based on a query.
+        Embeds a batch of (chunk_id, chunk) pairs, skipping chunks that could not be embedded.
         """
-        print(f"Querying ChromaDB for: '{query_text}'")
+        embeddings = self.embed_texts([chunk.text for _, chunk in batch])
+        return [(chunk_id, chunk, embedding)
+                for (chunk_id, chunk), embedding in zip(batch, embeddings)
+                if embedding is not None]
+
+    def embed_texts(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Returns one embedding per text (None where embedding failed), via the shared cache."""
+        return self.embedder.embed_texts(texts)
+
+    def retrieve_relevant_experience(self, query_text: str, n_results: int = 5,
+                                     where: Optional[dict] = None) -> list[str]:
+        """
+        Queries the vector store to find the most relevant resume chunks based on a query.
+        `where` filters on chunk metadata, e.g. {"section": "experience"}.
+        """
+        print(f"Querying vector store for: '{query_text}'")
         try:
             # First, get embeddings for the query
-            query_response = ollama.embeddings(model=Config.EMBEDDING_MODEL, prompt=query_text)
-            if 'embedding' not in query_response:
+            query_embedding = self.embed_texts([query_text])[0]
+            if query_embedding is None:
                 print("Warning: Could not generate embedding for query. Using fallback.")
                 return []
             
-            query_embedding = query_response['embedding']
-            
             # Query using embeddings
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents']
-            )
+            with span(VECTOR_STORE_SECONDS, operation="query", backend=Config.VECTOR_STORE_BACKEND):
+                results = self.store.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=where,
+                    include=['documents']
+                )
             relevant_docs = results['documents'][0] if results and 'documents' in results and results['documents'] else []
             print(f"Retrieved {len(relevant_docs)} relevant chunks.")
             return relevant_docs
             
         except Exception as e:
-            print(f"Error querying ChromaDB: {e}")
+            print(f"Error querying vector store: {e}")
             return []
+
+    def retrieve_relevant_experience_batch(self, query_texts: list[str], n_results: int = 5,
+                                           where: Optional[dict] = None) -> list[list[str]]:
+        """
+        Retrieves relevant chunks for several queries with one batched embedding
+        call and a single vector store query. Returns one list of documents per query.
+        """
+        print(f"Querying vector store for {len(query_texts)} queries.")
+        try:
+            return [[doc for _, doc in hits] for hits in self._query_batch(query_texts, n_results, where)]
+        except Exception as e:
+            print(f"Error querying vector store: {e}")
+            return [[] for _ in query_texts]
+
+    def retrieve_multi_query(self, queries: list[str], n_results: int = 5,
+                             where: Optional[dict] = None) -> list[str]:
+        """
+        Runs each query (e.g. one per extracted skill or responsibility) separately and
+        fuses the rankings with reciprocal-rank fusion, so strong matches for individual
+        topics are not diluted by one long blended query.
+        """
+        return self.retrieve_multi_query_batch([queries], n_results, where)[0]
+
+    def retrieve_multi_query_batch(self, query_groups: list[list[str]], n_results: int = 5,
+                                   where: Optional[dict] = None) -> list[list[str]]:
+        """
+        Multi-query retrieval for several groups at once: every query of every group is
+        embedded in one batched call and searched in a single vector store query, then
+        each group's rankings are fused with reciprocal-rank fusion and deduplicated.
+        """
+        flat_queries = list(dict.fromkeys(query for group in query_groups for query in group))
+        print(f"Multi-query retrieval: {len(flat_queries)} queries across {len(query_groups)} groups.")
+        try:
+            hits_by_query = dict(zip(flat_queries, self._query_batch(flat_queries, n_results, where)))
+        except Exception as e:
+            print(f"Error querying vector store: {e}")
+            return [[] for _ in query_groups]
+
+        fused_groups = []
+        for group in query_groups:
+            scores, documents = {}, {}
+            for query in dict.fromkeys(group):
+                for rank, (chunk_id, doc) in enumerate(hits_by_query.get(query, [])):
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (Config.RRF_K + rank + 1)
+                    documents[chunk_id] = doc
+            ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+            fused_groups.append([documents[chunk_id] for chunk_id in ranked])
+        return fused_groups
+
+    def _query_batch(self, query_texts: list[str], n_results: int,
+                     where: Optional[dict] = None) -> list[list[tuple[str, str]]]:
+        """Embeds all queries in one call and searches them in one query; returns (id, document) hits per query."""
+        hits = [[] for _ in query_texts]
+        query_embeddings = self.embed_texts(query_texts)
+        positions = [i for i, embedding in enumerate(query_embeddings) if embedding is not None]
+        if len(positions) < len(query_texts):
+            print(f"Warning: Could not generate embeddings for {len(query_texts) - len(positions)} queries.")
+        if not positions:
+            return hits
+
+        with span(VECTOR_STORE_SECONDS, operation="query", backend=Config.VECTOR_STORE_BACKEND):
+            results = self.store.query(
+                query_embeddings=[query_embeddings[i] for i in positions],
+                n_results=n_results,
+                where=where,
+                include=['documents']
+            )
+        for i, ids, docs in zip(positions, results.get('ids') or [], results.get('documents') or []):
+            hits[i] = list(zip(ids, docs))
+        return hits
+
+
+class ResumeProcessorPool:
+    """
+    Per-profile resume collections for multi-user deployments. Processors are opened
+    lazily on first use and kept in a bounded LRU, so one backend can serve a team
+    without holding every collection open. All processors share one embedder/cache.
+
+    A processor evicted while a request is still using it stays reachable until that
+    request drops it, and is handed out again if its profile is requested meanwhile:
+    two stores over the same collection would overwrite each other's writes.
+    Processors are opened outside the pool lock, so a slow open only delays requests
+    for that profile; concurrent requests for it wait on the same open.
+    """
+
+    def __init__(self, max_open: int = Config.MAX_OPEN_COLLECTIONS):
+        self.max_open = max(1, max_open)
+        self.embedder = CachedEmbedder()
+        self._processors: "OrderedDict[str, ResumeProcessor]" = OrderedDict()
+        self._evicted: "weakref.WeakValueDictionary[str, ResumeProcessor]" = weakref.WeakValueDictionary()
+        # Processors being opened, by profile
+        self._opening: "dict[str, Future]" = {}
+        self._lock = threading.Lock()
+
+    def get(self, profile: str = DEFAULT_PROFILE) -> ResumeProcessor:
+        collection_name = collection_name_for(profile)
+        with self._lock:
+            processor = self._processors.get(profile)
+            if processor is not None:
+                self._processors.move_to_end(profile)
+                return processor
+            processor = self._evicted.pop(profile, None)
+            if processor is not None:
+                self._admit(profile, processor)
+                return processor
+            opening = self._opening.get(profile)
+            if opening is not None:
+                owner = False
+            else:
+                opening = self._opening[profile] = Future()
+                owner = True
+        if not owner:
+            return opening.result()
+
+        try:
+            processor = ResumeProcessor(collection_name, embedder=self.embedder)
+        except BaseException as e:
+            with self._lock:
+                del self._opening[profile]
+            opening.set_exception(e)
+            raise
+        with self._lock:
+            del self._opening[profile]
+            self._admit(profile, processor)
+        opening.set_result(processor)
+        return processor
+
+    def _admit(self, profile: str, processor: "ResumeProcessor"):
+        """Adds an open processor to the LRU, evicting the least recently used. Call with the lock held."""
+        self._processors[profile] = processor
+        while len(self._processors) > self.max_open:
+            closed, closed_processor = self._processors.popitem(last=False)
+            self._evicted[closed] = closed_processor
+            print(f"Closed collection handle for profile '{closed}'.")
+
+    def embed_texts(self, texts: list[str]) -> list[Optional[list[float]]]:
+        return self.embedder.embed_texts(texts)
+
+    def list_collections(self) -> list[dict]:
+        """Lists every stored resume collection with its size and whether its handle is open."""
+        with self._lock:
+            open_processors = dict(self._processors)
+            live_processors = {**dict(self._evicted.items()), **open_processors}
+        collections = []
+        for name in list_vector_collections():
+            profile = profile_for_collection(name)
+            if profile is None:
+                continue
+            if profile in live_processors:
+                count = live_processors[profile].store.count()
+            else:
+                # Count without opening a store or pulling the collection into the LRU
+                count = count_vector_collection(name)
+            collections.append({
+                "profile": profile,
+                "collection": name,
+                "count": count,
+                "open": profile in open_processors
+            })
+        return collections
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Union
+from metrics import CACHE_REQUESTS
+
+Value = Union[bytes, str]
+
+class SQLiteLRUStore:
+    """
+    Persistent key-value table in SQLite with size-based LRU eviction, shared by the
+    embedding cache and the LLM response memo. Rows are (key, extra columns...,
+    value, size, last_access); the extra columns (e.g. model, task) are stored for
+    inspection only. Lookups are counted under `name` in the cache metrics.
+    """
+
+    def __init__(self, path: str, table: str, value_column: str, max_bytes: int, name: str,
+                 extra_columns: Iterable[str] = ()):
+        self.path = path
+        self.table = table
+        self.value_column = value_column.split()[0]
+        self.extra_columns = [column.split()[0] for column in extra_columns]
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(["key TEXT PRIMARY KEY", *extra_columns, value_column,
+                             "size INTEGER NOT NULL", "last_access REAL NOT NULL"])
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Value]:
+        """Returns the stored values of the given keys; missing keys are absent from the result."""
+        key_list = list(dict.fromkeys(keys))
+        if not key_list:
+            return {}
+        found = {}
+        with self._lock:
+            for start in range(0, len(key_list), 500):
+                part = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(key_list) - len(found)
+        CACHE_REQUESTS.inc(len(found), cache=self.name, result="hit")
+        CACHE_REQUESTS.inc(len(key_list) - len(found), cache=self.name, result="miss")
+        return found
+
+    def put_many(self, items: Dict[str, Value], **extra):
+        """
+        Stores values (with the same extra column values for every row) and evicts
+        least recently used entries if over budget.
+        """
+        if not items:
+            return
+        now = time.time()
+        extra_values = [extra[column] for column in self.extra_columns]
+        rows = [
+            (key, *extra_values, value, len(value.encode("utf-8") if isinstance(value, str) else value), now)
+            for key, value in items.items()
+        ]
+        columns = ["key", *self.extra_columns, self.value_column, "size", "last_access"]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the budget so we don't evict on every insert
+        target = int(self.max_bytes * 0.9)
+        doomed: List[str] = []
+        for key, size in self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY last_access ASC"
+        ):
+            if total <= target:
+                break
+            doomed.append(key)
+            total -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in doomed])
+        self.evictions += len(doomed)
+        print(f"{self.path}: evicted {len(doomed)} least recently used entries.")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+from metrics import WORKFLOW_NODE_SECONDS, in_context, record_span
+
+
+class _Node:
+    def __init__(self, name: str, func: Callable, after: Tuple[str, ...], speculative: bool):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.speculative = speculative
+        # pending -> running -> done | failed, or cancelled / skipped (a dependency did not finish)
+        self.status = "pending"
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.handle = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.settled = threading.Event()
+
+
+class TaskGraph:
+    """
+    A small dependency graph of workflow steps. Each node starts as soon as the nodes
+    it depends on have finished, so independent steps overlap and end-to-end latency
+    approaches the critical path. A node receives its dependencies' results as
+    positional arguments, in the order they were declared.
+
+    Speculative nodes compute something that may turn out not to be needed. Another
+    node can cancel() one once its output is superseded: if it has not started it
+    never runs, and if it is running its result is discarded. A speculative node
+    failing does not fail the graph.
+    """
+
+    def __init__(self, name: str = "workflow"):
+        self.name = name
+        self._nodes: Dict[str, _Node] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add(self, name: str, func: Callable, after: Tuple[str, ...] = (),
+            speculative: bool = False) -> "TaskGraph":
+        """Adds a node. Dependencies must already be in the graph, which rules out cycles."""
+        if name in self._nodes:
+            raise ValueError(f"Duplicate task graph node '{name}'")
+        unknown = [dependency for dependency in after if dependency not in self._nodes]
+        if unknown:
+            raise ValueError(f"Node '{name}' depends on unknown nodes: {', '.join(unknown)}")
+        self._nodes[name] = _Node(name, func, tuple(after), speculative)
+        return self
+
+    def cancel(self, name: str):
+        """Marks a node (and anything depending on it) as superseded; safe to call from any node."""
+        with self._lock:
+            cancelled = self._cancel(self._nodes[name])
+        for node in cancelled:
+            self._record(node)
+
+    def _cancel(self, node: _Node) -> list:
+        if node.status not in ("pending", "running"):
+            return []
+        node.status = "cancelled"
+        node.finished = time.perf_counter()
+        if isinstance(node.handle, Future):
+            node.handle.cancel()
+        elif isinstance(node.handle, asyncio.Task) and node.loop is not None:
+            node.loop.call_soon_threadsafe(node.handle.cancel)
+        node.settled.set()
+        cancelled = [node]
+        for dependent in self._nodes.values():
+            if node.name in dependent.after:
+                cancelled.extend(self._cancel(dependent))
+        return cancelled
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Waits for a node that is not a declared dependency (e.g. a speculative one) and returns its result."""
+        node = self._nodes[name]
+        if not node.settled.wait(timeout):
+            raise TimeoutError(f"Task graph node '{name}' did not finish within {timeout}s")
+        if node.status == "failed":
+            raise node.error
+        if node.status != "done":
+            raise CancelledError(f"Task graph node '{name}' was {node.status}")
+        return node.value
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        """Per node: status, start offset from the graph's start and duration, in milliseconds."""
+        timings = {}
+        for node in self._nodes.values():
+            entry = {"status": node.status}
+            if node.started is not None:
+                entry["start_ms"] = round((node.started - self._started) * 1000, 1)
+                if node.finished is not None:
+                    entry["ms"] = round((node.finished - node.started) * 1000, 1)
+            timings[node.name] = entry
+        return timings
+
+    # --- Running -----------------------------------------------------------
+
+    def run(self, cancelled: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Runs the graph on worker threads and returns the results of the nodes that
+        completed. If `cancelled` is set, no further nodes start and CancelledError
+        is raised once a running node finishes.
+        """
+        self._started = time.perf_counter()
+        # One thread per node: nodes may block waiting on each other via result()
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self._nodes)), thread_name_prefix=self.name)
+        running: Dict[Future, _Node] = {}
+        try:
+            while True:
+                self._check_cancelled(cancelled)
+                for node in self._ready():
+                    node.handle = executor.submit(in_context(self._execute), node)
+                    running[node.handle] = node
+                active = [future for future, node in running.items() if node.status == "running"]
+                if not active:
+                    break
+                finished, _ = wait(active, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    error = future.exception()
+                    self._settle(node, None if error else future.result(), error)
+        finally:
+            self._abandon()
+            # Superseded speculative work may still be running; nothing waits for it
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self._results()
+
+    async def run_async(self, cancelled: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Runs the graph on the event loop. Coroutine functions are awaited directly;
+        plain functions run in a worker thread. `cancelled` works as in run().
+        """
+        self._started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        running: Dict[asyncio.Task, _Node] = {}
+        try:
+            while True:
+                self._check_cancelled(cancelled)
+                for node in self._ready():
+                    node.loop = loop
+                    node.handle = asyncio.ensure_future(self._execute_async(node))
+                    running[node.handle] = node
+                active = [task for task, node in running.items() if node.status == "running"]
+                if not active:
+                    break
+                finished, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    node = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    self._settle(node, None if error else task.result(), error)
+        finally:
+            self._abandon()
+            for task, node in running.items():
+                if not task.done():
+                    task.cancel()
+        return self._results()
+
+    def _check_cancelled(self, cancelled: Optional[threading.Event]):
+        if cancelled is not None and cancelled.is_set():
+            raise CancelledError(f"{self.name} was cancelled")
+
+    def _ready(self) -> list:
+        """Pending nodes whose dependencies are done, marked running; skips nodes whose dependencies are not."""
+        ready = []
+        skipped = []
+        with self._lock:
+            for node in self._nodes.values():
+                if node.status != "pending":
+                    continue
+                statuses = [self._nodes[dependency].status for dependency in node.after]
+                if all(status == "done" for status in statuses):
+                    node.status = "running"
+                    ready.append(node)
+                elif any(status in ("failed", "cancelled", "skipped") for status in statuses):
+                    node.status = "skipped"
+                    node.settled.set()
+                    skipped.append(node)
+        for node in skipped:
+            self._record(node)
+        return ready
+
+    def _arguments(self, node: _Node) -> list:
+        return [self._nodes[dependency].value for dependency in node.after]
+
+    def _execute(self, node: _Node) -> Any:
+        node.started = time.perf_counter()
+        return node.func(*self._arguments(node))
+
+    async def _execute_async(self, node: _Node) -> Any:
+        node.started = time.perf_counter()
+        if asyncio.iscoroutinefunction(node.func):
+            return await node.func(*self._arguments(node))
+        return await asyncio.to_thread(node.func, *self._arguments(node))
+
+    def _settle(self, node: _Node, value: Any, error: Optional[BaseException]):
+        with self._lock:
+            if node.status != "running":
+                # Cancelled while running: the result is no longer wanted
+                return
+            node.finished = time.perf_counter()
+            if error is None:
+                node.status, node.value = "done", value
+            else:
+                node.status, node.error = "failed", error
+            node.settled.set()
+        self._record(node)
+        if error is not None and not node.speculative:
+            raise error
+        if error is not None:
+            print(f"Task graph: speculative node '{node.name}' failed: {error}")
+
+    def _abandon(self):
+        """Cancels whatever has not finished once the graph stops (normally only superseded work)."""
+        with self._lock:
+            cancelled = []
+            for node in self._nodes.values():
+                cancelled.extend(self._cancel(node))
+        for node in cancelled:
+            self._record(node)
+
+    def _record(self, node: _Node):
+        if node.started is None:
+            return
+        record_span(WORKFLOW_NODE_SECONDS, node.started, node.finished or time.perf_counter(),
+                    node=node.name, status=node.status)
+
+    def _results(self) -> Dict[str, Any]:
+        return {node.name: node.value for node in self._nodes.values() if node.status == "done"}
@@ -0,0 +1,378 @@
+import glob
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+from config import Config
+
+class VectorStore:
+    """
+    Minimal interface the resume processor needs from a vector database. Method
+    signatures and return shapes follow ChromaDB's collection API so backends are
+    interchangeable.
+    """
+
+    name: str
+
+    def get(self, include: Optional[List[str]] = None) -> Dict:
+        """Returns {'ids': [...], 'metadatas': [...], 'documents': [...]} for every stored item."""
+        raise NotImplementedError
+
+    def add(self, ids: List[str], documents: List[str], embeddings: List[List[float]],
+            metadatas: Optional[List[Dict]] = None):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 5,
+              where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        """
+        Returns the n_results nearest items per query embedding as
+        {'ids': [[...]], 'documents': [[...]], 'metadatas': [[...]], 'distances': [[...]]}.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def reset(self):
+        """Drops every stored item, e.g. after the embedding model changed."""
+        raise NotImplementedError
+
+
+_chroma_clients = {}
+_chroma_clients_lock = threading.Lock()
+
+def _chroma_client(db_path: str):
+    """One PersistentClient per database path, shared by every collection in it."""
+    with _chroma_clients_lock:
+        if db_path not in _chroma_clients:
+            # Imported here so the NumPy backend does not pay chromadb's import cost
+            import chromadb
+            _chroma_clients[db_path] = chromadb.PersistentClient(path=db_path)
+        return _chroma_clients[db_path]
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB-backed store; the original persistence layer."""
+
+    def __init__(self, collection_name: str, db_path: str = Config.CHROMA_DB_PATH):
+        self.name = collection_name
+        self.client = _chroma_client(db_path)
+        self.collection = self.client.get_or_create_collection(name=collection_name)
+        print(f"Initialized ChromaDB client at {db_path} with collection '{collection_name}'")
+
+    def get(self, include: Optional[List[str]] = None) -> Dict:
+        return self.collection.get(include=include or ['metadatas'])
+
+    def add(self, ids, documents, embeddings, metadatas=None):
+        self.collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=include or ['documents']
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def reset(self):
+        try:
+            self.client.delete_collection(name=self.name)
+            print("Deleted existing collection.")
+        except Exception as e:
+            print(f"Could not delete collection (might not exist): {e}")
+        self.collection = self.client.create_collection(name=self.name)
+        print(f"Recreated collection '{self.name}'")
+
+
+# Stored vectors are converted to float32 at most this many rows at a time, so a
+# float16 collection never needs a full float32 copy in memory
+BLOCK_ROWS = 4096
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Lightweight in-process store for small collections: vectors live in a
+    memory-mapped .npy file and documents/metadata in a JSON sidecar. The sidecar
+    is the manifest: it names the vectors file of its version and the row count,
+    and replacing it is the single step that commits a write. Queries are exact
+    top-k by squared L2 distance (ChromaDB's default metric) computed with
+    vectorized dot products, so rankings match the Chroma backend.
+    """
+
+    def __init__(self, collection_name: str, dir_path: str = Config.NUMPY_STORE_PATH,
+                 dtype: str = Config.VECTOR_STORE_DTYPE):
+        import numpy as np
+        self._np = np
+        self.name = collection_name
+        self.dtype = np.dtype(dtype)
+        os.makedirs(dir_path, exist_ok=True)
+        self._dir_path = dir_path
+        self._sidecar_path = os.path.join(dir_path, f"{collection_name}.json")
+        self._vectors_path = None
+        self._version = 0
+        self._lock = threading.RLock()
+        self._load()
+        print(f"Initialized NumPy vector store at {dir_path} with collection '{collection_name}' ({len(self._ids)} items)")
+
+    def _versioned_path(self, version: int) -> str:
+        return os.path.join(self._dir_path, f"{self.name}.v{version}.npy")
+
+    def _load(self):
+        np = self._np
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._vectors = None
+        self._vectors_path = None
+        if os.path.exists(self._sidecar_path):
+            with open(self._sidecar_path, encoding="utf-8") as f:
+                sidecar = json.load(f)
+            self._version = sidecar.get("version", 0)
+            # Sidecars written before versioning pointed at a fixed file name
+            vectors_path = (os.path.join(self._dir_path, sidecar["vectors"]) if "vectors" in sidecar
+                            else os.path.join(self._dir_path, f"{self.name}.npy"))
+            if os.path.exists(vectors_path):
+                vectors = np.load(vectors_path, mmap_mode="r")
+                if vectors.shape[0] != len(sidecar["ids"]):
+                    raise ValueError(
+                        f"Vector store '{self.name}' is inconsistent: {vectors_path} has {vectors.shape[0]} "
+                        f"rows but {self._sidecar_path} lists {len(sidecar['ids'])} IDs"
+                    )
+                self._ids = sidecar["ids"]
+                self._documents = sidecar["documents"]
+                self._metadatas = sidecar["metadatas"]
+                self._vectors = vectors
+                self._vectors_path = vectors_path
+        self._index = {item_id: i for i, item_id in enumerate(self._ids)}
+        self._refresh_norms()
+        self._remove_stale_vectors()
+
+    def _remove_stale_vectors(self):
+        """Deletes vector files no manifest points at (left by a write interrupted before its commit)."""
+        for path in glob.glob(os.path.join(glob.escape(self._dir_path), f"{glob.escape(self.name)}.v*.npy")):
+            if path != self._vectors_path:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Could not remove stale vector file {path}: {e}")
+
+    def _blocks(self, rows=None) -> Iterator:
+        """Yields (start, float32 block) over the stored vectors, or over the given row indices."""
+        np = self._np
+        total = self._vectors.shape[0] if rows is None else len(rows)
+        for start in range(0, total, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, total)
+            block = self._vectors[start:stop] if rows is None else self._vectors[rows[start:stop]]
+            yield start, np.asarray(block, dtype=np.float32)
+
+    def _refresh_norms(self):
+        np = self._np
+        if self._vectors is None or not len(self._ids):
+            self._norms = None
+            return
+        self._norms = np.empty(self._vectors.shape[0], dtype=np.float32)
+        for start, block in self._blocks():
+            self._norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    def _save(self, vectors):
+        """
+        Writes the vectors to a new versioned file, then commits by atomically
+        replacing the manifest; a crash at any point leaves the previous version intact.
+        """
+        np = self._np
+        version = self._version + 1
+        vectors_path = self._versioned_path(version)
+        tmp_sidecar = self._sidecar_path + ".tmp"
+        np.save(vectors_path, np.asarray(vectors, dtype=self.dtype))
+        with open(tmp_sidecar, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "vectors": os.path.basename(vectors_path),
+                       "ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}, f)
+        os.replace(tmp_sidecar, self._sidecar_path)
+        old_path = self._vectors_path
+        self._version = version
+        self._vectors_path = vectors_path
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._index = {item_id: i for i, item_id in enumerate(self._ids)}
+        self._refresh_norms()
+        if old_path is not None and old_path != vectors_path:
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                # Still mapped elsewhere (e.g. on Windows); removed on the next load
+                print(f"Could not remove old vector file {old_path}: {e}")
+
+    def get(self, include=None):
+        include = include or ['metadatas']
+        with self._lock:
+            result = {"ids": list(self._ids)}
+            if 'metadatas' in include:
+                result["metadatas"] = list(self._metadatas)
+            if 'documents' in include:
+                result["documents"] = list(self._documents)
+            return result
+
+    def add(self, ids, documents, embeddings, metadatas=None):
+        np = self._np
+        metadatas = metadatas or [None] * len(ids)
+        if len(set(ids)) != len(ids):
+            raise ValueError("Expected IDs to be unique within one add call")
+        with self._lock:
+            # Like ChromaDB, entries whose ID already exists are kept and the new ones ignored
+            # (e.g. two concurrent ingests of the same resume)
+            new = [i for i, item_id in enumerate(ids) if item_id not in self._index]
+            if not new:
+                return
+            if len(new) != len(ids):
+                print(f"Vector store: ignoring {len(ids) - len(new)} IDs that already exist.")
+                ids = [ids[i] for i in new]
+                documents = [documents[i] for i in new]
+                embeddings = [embeddings[i] for i in new]
+                metadatas = [metadatas[i] for i in new]
+            new_vectors = np.asarray(embeddings, dtype=self.dtype)
+            if self._vectors is not None and len(self._ids):
+                if new_vectors.shape[1] != self._vectors.shape[1]:
+                    raise ValueError(
+                        f"Embedding dimension {new_vectors.shape[1]} does not match "
+                        f"collection dimension {self._vectors.shape[1]}"
+                    )
+                vectors = np.vstack([self._vectors, new_vectors])
+            else:
+                vectors = new_vectors
+            for item_id, document, metadata in zip(ids, documents, metadatas):
+                self._index[item_id] = len(self._ids)
+                self._ids.append(item_id)
+                self._documents.append(document)
+                self._metadatas.append(metadata)
+            self._save(vectors)
+
+    def delete(self, ids):
+        np = self._np
+        doomed = set(ids)
+        with self._lock:
+            keep = [i for i, item_id in enumerate(self._ids) if item_id not in doomed]
+            if len(keep) == len(self._ids):
+                return
+            vectors = self._vectors[keep] if self._vectors is not None else []
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._save(vectors)
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        np = self._np
+        include = include or ['documents']
+        with self._lock:
+            result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            candidates = [i for i, metadata in enumerate(self._metadatas) if _matches_where(metadata, where)]
+            if self._vectors is None or not candidates:
+                for _ in query_embeddings:
+                    for key in result:
+                        result[key].append([])
+                return result
+
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            candidate_index = np.asarray(candidates)
+            # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, for all queries at once
+            products = np.empty((len(queries), len(candidates)), dtype=np.float32)
+            rows = None if len(candidates) == len(self._ids) else candidate_index
+            for start, block in self._blocks(rows):
+                products[:, start:start + len(block)] = queries @ block.T
+            distances = (
+                self._norms[candidate_index][None, :]
+                - 2.0 * products
+                + np.einsum("ij,ij->i", queries, queries)[:, None]
+            )
+            k = min(n_results, len(candidates))
+            for row in distances:
+                top = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+                top = top[np.lexsort((top, row[top]))]
+                positions = candidate_index[top]
+                result["ids"].append([self._ids[i] for i in positions])
+                result["documents"].append([self._documents[i] for i in positions])
+                result["metadatas"].append([self._metadatas[i] for i in positions])
+                result["distances"].append([float(max(d, 0.0)) for d in row[top]])
+            return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def reset(self):
+        with self._lock:
+            self._vectors = None
+            legacy_path = os.path.join(self._dir_path, f"{self.name}.npy")
+            for path in (self._vectors_path, self._sidecar_path, legacy_path):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+            self._load()
+        print(f"Reset NumPy vector store collection '{self.name}'")
+
+
+def _matches_where(metadata: Optional[Dict], where: Optional[Dict]) -> bool:
+    """Evaluates the subset of Chroma's `where` filter syntax used by this app ($and, $or, $eq, $ne, $in)."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def create_vector_store(collection_name: str) -> VectorStore:
+    """Builds the vector store selected by Config.VECTOR_STORE_BACKEND."""
+    backend = Config.VECTOR_STORE_BACKEND
+    if backend == "numpy":
+        return NumpyVectorStore(collection_name)
+    if backend == "chroma":
+        return ChromaVectorStore(collection_name)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}. Expected 'chroma' or 'numpy'.")
+
+
+def count_vector_collection(collection_name: str) -> int:
+    """Item count of a persisted collection, read without opening a store over it."""
+    if Config.VECTOR_STORE_BACKEND == "numpy":
+        sidecar_path = os.path.join(Config.NUMPY_STORE_PATH, f"{collection_name}.json")
+        if not os.path.exists(sidecar_path):
+            return 0
+        with open(sidecar_path, encoding="utf-8") as f:
+            return len(json.load(f)["ids"])
+    return _chroma_client(Config.CHROMA_DB_PATH).get_collection(name=collection_name).count()
+
+
+def list_vector_collections() -> List[str]:
+    """Names of all collections persisted by the configured backend."""
+    if Config.VECTOR_STORE_BACKEND == "numpy":
+        if not os.path.isdir(Config.NUMPY_STORE_PATH):
+            return []
+        return sorted(
+            name[:-len(".json")] for name in os.listdir(Config.NUMPY_STORE_PATH)
+            if name.endswith(".json") and not name.endswith(".tmp")
+        )
+    collections = _chroma_client(Config.CHROMA_DB_PATH).list_collections()
+    # chromadb >= 0.6 returns names, older versions return Collection objects
+    return sorted(getattr(collection, "name", collection) for collection in collections)
@@ -1,5 +1,5 @@
-// API Configuration
-const API_BASE_URL = 'http://localhost:8000';
+// API Configuration (frontend/server.py sets the base to its same-origin /api proxy)
+const API_BASE_URL = window.CAREERPILOT_API_BASE || 'http://localhost:8000';
 
 // DOM Elements
 const statusCard = document.getElementById('statusCard');
@@ -190,7 +190,7 @@ function validateForm() {
     tailorBtn.disabled = !(resumeUploaded && hasJobDescription);
 }
 
-// Tailor resume
+// Tailor resume (streams generated text and ATS sub-scores as they arrive)
 async function tailorResume() {
     const jobDescText = jobDescription.value.trim();
     
@@ -205,9 +205,10 @@ async function tailorResume() {
     }
     
     showLoading('Analyzing job description and tailoring your resume...');
+    resetResults();
     
     try {
-        const response = await fetch(`${API_BASE_URL}/tailor-resume/`, {
+        const response = await fetch(`${API_BASE_URL}/tailor-resume/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -222,8 +223,7 @@ async function tailorResume() {
             throw new Error(errorData.detail || 'Failed to tailor resume');
         }
         
-        const data = await response.json();
-        displayResults(data.tailored_resume);
+        await readEventStream(response, handleTailorEvent);
         hideLoading();
         
         showToast('Resume tailored successfully!', 'success');
@@ -235,31 +235,86 @@ async function tailorResume() {
     }
 }
 
-// Display results
-function displayResults(data) {
-    // Handle both old format (string) and new format (object)
-    let tailoredResume, atsScore;
+// Read a Server-Sent-Events response body and dispatch each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
     
-    if (typeof data === 'string') {
-        tailoredResume = data;
-        atsScore = null;
-    } else {
-        tailoredResume = data.tailored_resume;
-        atsScore = data.ats_score;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            const dataLines = [];
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            onEvent(eventName, dataLines.length ? JSON.parse(dataLines.join('\n')) : {});
+        }
     }
-    
-    // Display tailored resume
-    resultsContent.textContent = tailoredResume;
-    
-    // Display ATS score if available
-    if (atsScore) {
-        displayATSScore(atsScore);
+}
+
+// Update the UI for one streaming event from /tailor-resume/stream
+function handleTailorEvent(eventName, data) {
+    switch (eventName) {
+        case 'analysis':
+            loadingText.textContent = 'Job analyzed. Searching your master resume...';
+            break;
+        case 'retrieval':
+            loadingText.textContent = 'Relevant experience found. Writing your tailored resume...';
+            break;
+        case 'token':
+            if (loadingOverlay.style.display !== 'none') {
+                hideLoading();
+                resultsSection.style.display = 'block';
+                resultsSection.scrollIntoView({ behavior: 'smooth' });
+            }
+            resultsContent.textContent += data.text;
+            break;
+        case 'generation':
+            resultsContent.textContent = data.tailored_resume;
+            document.getElementById('atsAnalysis').innerHTML = `
+                <h3><i class="fas fa-search"></i> Detailed Analysis</h3>
+                <p>Calculating ATS score...</p>
+            `;
+            break;
+        case 'ats_subscore':
+            updateSubScore(data.name, data.value);
+            break;
+        case 'ats_score':
+            displayATSScore(data);
+            break;
+        case 'error':
+            throw new Error(data.detail);
     }
-    
-    resultsSection.style.display = 'block';
-    
-    // Scroll to results
-    resultsSection.scrollIntoView({ behavior: 'smooth' });
+}
+
+// Clear results from a previous run
+function resetResults() {
+    resultsContent.textContent = '';
+    document.getElementById('scoreNumber').textContent = '0';
+    ['keyword', 'skill', 'experience', 'format'].forEach(name => updateSubScore(`${name}_score`, 0));
+    document.getElementById('atsAnalysis').innerHTML = '';
+    document.getElementById('recommendations').innerHTML = '';
+}
+
+// Update a single ATS sub-score (e.g. "keyword_score") as soon as it is known
+function updateSubScore(name, value) {
+    if (name === 'overall_score') {
+        document.getElementById('scoreNumber').textContent = value;
+        return;
+    }
+    const prefix = name.replace('_score', '');
+    updateScoreBar(`${prefix}Score`, value);
+    document.getElementById(`${prefix}ScoreValue`).textContent = `${Math.round(value)}%`;
 }
 
 // Display ATS score
@@ -1,45 +1,385 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server to serve the Career-Pilot AI frontend
+HTTP server for the Career-Pilot AI frontend.
+
+Static files are loaded once at startup, fingerprinted and precompressed (gzip,
+plus brotli when the optional `brotli` package is installed), then served from
+memory by a threaded HTTP/1.1 server with keep-alive and ETag/Last-Modified
+revalidation. Requests under /api/ are proxied to the backend, so the UI talks
+to a single origin and its API calls need no cross-origin preflight.
 """
 
+import argparse
+import email.utils
+import gzip
+import hashlib
+import http.client
 import http.server
-import socketserver
+import mimetypes
 import os
-import sys
+import re
+import urllib.parse
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Get the directory where this script is located
 FRONTEND_DIR = Path(__file__).parent
-PORT = 3000
-
-class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(FRONTEND_DIR), **kwargs)
-    
-    def end_headers(self):
-        # Add CORS headers
+PORT = int(os.getenv("FRONTEND_PORT", "3000"))
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+API_PREFIX = "/api"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 256
+# Fingerprinted URLs change whenever the content does, so browsers may keep them for a year
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# Local references in HTML that are rewritten to their fingerprinted URL
+ASSET_REFERENCE = re.compile(r'(?P<attr>href|src)="(?:\./)?(?P<path>[^"#?:]+)"')
+# Headers that describe one connection and must not be forwarded by the proxy
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+              "trailers", "transfer-encoding", "upgrade", "host", "content-length", "date", "server"}
+PROXY_BLOCK_BYTES = 64 * 1024
+PROXY_TIMEOUT_SECONDS = 600
+
+
+class Asset(NamedTuple):
+    content_type: str
+    # Content by encoding ("identity", "gzip", "br"); compressed variants only when smaller
+    variants: Dict[str, bytes]
+    digest: str
+    last_modified: int
+    cache_control: str
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+def make_asset(data: bytes, content_type: str, last_modified: float, cache_control: str) -> Asset:
+    variants = {"identity": data}
+    if len(data) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+        compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(data, quality=11)
+        variants.update({encoding: body for encoding, body in compressed.items() if len(body) < len(data)})
+    return Asset(content_type, variants, hashlib.sha256(data).hexdigest()[:16], int(last_modified), cache_control)
+
+
+def content_type_for(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def load_assets(directory: Path, api_base: Optional[str]) -> Dict[str, Asset]:
+    """
+    Reads every servable file under `directory` into memory. Non-HTML files are
+    served both under their own name (revalidated on each use) and under a
+    fingerprinted name such as /styles.3f2a9c1e.css (cached for a year). HTML
+    pages reference the fingerprinted names, and when `api_base` is given they
+    set window.CAREERPILOT_API_BASE so script.js sends API calls there.
+    """
+    files = [path for path in sorted(directory.rglob("*"))
+             if path.is_file() and path.suffix != ".py"
+             and not any(part.startswith((".", "__")) for part in path.relative_to(directory).parts)]
+
+    assets: Dict[str, Asset] = {}
+    fingerprinted: Dict[str, str] = {}
+    newest = 0.0
+    for path in files:
+        if path.suffix == ".html":
+            continue
+        relative = path.relative_to(directory).as_posix()
+        data = path.read_bytes()
+        mtime = path.stat().st_mtime
+        newest = max(newest, mtime)
+        content_type = content_type_for(path)
+        asset = make_asset(data, content_type, mtime, IMMUTABLE_CACHE)
+        stem, dot, suffix = relative.rpartition(".")
+        versioned = f"{stem}.{asset.digest[:10]}.{suffix}" if dot else f"{relative}.{asset.digest[:10]}"
+        assets[f"/{versioned}"] = asset
+        assets[f"/{relative}"] = asset._replace(cache_control=REVALIDATE_CACHE)
+        fingerprinted[relative] = versioned
+
+    def rewrite(match: re.Match) -> str:
+        versioned = fingerprinted.get(match.group("path").lstrip("/"))
+        return f'{match.group("attr")}="{versioned}"' if versioned else match.group(0)
+
+    for path in files:
+        if path.suffix != ".html":
+            continue
+        relative = path.relative_to(directory).as_posix()
+        html = ASSET_REFERENCE.sub(rewrite, path.read_text(encoding="utf-8"))
+        if api_base is not None:
+            html = html.replace("</head>", f"<script>window.CAREERPILOT_API_BASE = \"{api_base}\";</script>\n</head>", 1)
+        # The page changes whenever an asset it references does
+        mtime = max(path.stat().st_mtime, newest)
+        asset = make_asset(html.encode("utf-8"), content_type_for(path), mtime, REVALIDATE_CACHE)
+        assets[f"/{relative}"] = asset
+        if path.name == "index.html":
+            parent = path.parent.relative_to(directory).as_posix()
+            assets["/" if parent == "." else f"/{parent}/"] = asset
+    return assets
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parses Accept-Encoding into {coding: q}."""
+    encodings = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class FrontendServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, assets: Dict[str, Asset], backend_url: Optional[str]):
+        super().__init__(address, CustomHTTPRequestHandler)
+        self.assets = assets
+        self.backend_url = backend_url
+
+
+class CustomHTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response carries a length
+    protocol_version = "HTTP/1.1"
+    server_version = "CareerPilotFrontend/1.0"
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 60
+
+    def do_GET(self):
+        if self._is_api_request():
+            self._proxy()
+        else:
+            self._serve_static(include_body=True)
+
+    def do_HEAD(self):
+        if self._is_api_request():
+            self._proxy()
+        else:
+            self._serve_static(include_body=False)
+
+    def do_POST(self):
+        self._proxy_or_reject()
+
+    def do_PUT(self):
+        self._proxy_or_reject()
+
+    def do_PATCH(self):
+        self._proxy_or_reject()
+
+    def do_DELETE(self):
+        self._proxy_or_reject()
+
+    def do_OPTIONS(self):
+        if self._is_api_request():
+            self._proxy()
+            return
+        self.send_response(200)
+        self._send_cors_headers()
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_cors_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        super().end_headers()
-    
-    def do_OPTIONS(self):
+
+    # --- Static files ------------------------------------------------------
+
+    def _serve_static(self, include_body: bool):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        asset = self.server.assets.get(path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+
+        encoding = self._choose_encoding(asset)
+        etag = asset.etag(encoding)
+        if self._not_modified(asset, etag):
+            self.send_response(304)
+            self._send_cache_headers(asset, etag)
+            self.end_headers()
+            return
+
+        body = asset.variants[encoding]
         self.send_response(200)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self._send_cache_headers(asset, etag)
+        self._send_cors_headers()
         self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def _send_cache_headers(self, asset: Asset, etag: str):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(asset.last_modified, usegmt=True))
+        self.send_header("Cache-Control", asset.cache_control)
+        if len(asset.variants) > 1:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def _choose_encoding(self, asset: Asset) -> str:
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        # Brotli compresses text assets noticeably better than gzip, so it is preferred when offered
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+    def _not_modified(self, asset: Asset, etag: str) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # Weak comparison: any variant of the same content matches
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+            return "*" in tags or any(tag == etag or tag.startswith(f'"{asset.digest}') for tag in tags)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return asset.last_modified <= since
+        return False
+
+    # --- Backend proxy -----------------------------------------------------
+
+    def _is_api_request(self) -> bool:
+        return self.server.backend_url is not None and (
+            self.path == API_PREFIX or self.path.startswith((f"{API_PREFIX}/", f"{API_PREFIX}?"))
+        )
+
+    def _proxy_or_reject(self):
+        if self._is_api_request():
+            self._proxy()
+        else:
+            self.send_error(405, "Method not allowed")
+
+    def _proxy(self):
+        """
+        Forwards the request to the backend with /api stripped, streaming the request
+        body up and the response down, so uploads are not buffered here and
+        Server-Sent Events reach the browser as soon as the backend sends them.
+        """
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            self.send_error(411, "Length required")
+            return
+        target = urllib.parse.urlsplit(self.server.backend_url)
+        # "/api", "/api/x" and "/api?q" map to "/", "/x" and "/?q" on the backend
+        remainder = self.path[len(API_PREFIX):]
+        if not remainder.startswith("/"):
+            remainder = "/" + remainder
+        length = int(self.headers.get("Content-Length") or 0)
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=PROXY_TIMEOUT_SECONDS)
+        try:
+            try:
+                connection.putrequest(self.command, target.path.rstrip("/") + remainder,
+                                      skip_host=True, skip_accept_encoding=True)
+                connection.putheader("Host", target.netloc)
+                for name, value in self.headers.items():
+                    if name.lower() not in HOP_BY_HOP:
+                        connection.putheader(name, value)
+                connection.putheader("X-Forwarded-For", self.client_address[0])
+                connection.putheader("X-Forwarded-Host", self.headers.get("Host", ""))
+                connection.putheader("X-Forwarded-Prefix", API_PREFIX)
+                if length:
+                    connection.putheader("Content-Length", str(length))
+                connection.endheaders()
+                remaining = length
+                while remaining > 0:
+                    block = self.rfile.read(min(PROXY_BLOCK_BYTES, remaining))
+                    if not block:
+                        break
+                    connection.send(block)
+                    remaining -= len(block)
+                response = connection.getresponse()
+            except OSError as e:
+                # Any unread request body would be taken for the next request on this connection
+                self.close_connection = True
+                self.send_error(502, f"Backend unavailable: {e}")
+                return
+            self._relay(response)
+        finally:
+            connection.close()
+
+    def _relay(self, response: http.client.HTTPResponse):
+        self.send_response(response.status, response.reason)
+        for name, value in response.getheaders():
+            if name.lower() not in HOP_BY_HOP:
+                self.send_header(name, value)
+
+        has_body = self.command != "HEAD" and response.status not in (204, 304) and response.status >= 200
+        content_length = response.getheader("Content-Length")
+        chunked = has_body and content_length is None
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        elif content_length is not None:
+            self.send_header("Content-Length", content_length)
+        else:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+        if not has_body:
+            return
+
+        try:
+            while True:
+                # read1 returns as soon as some data has arrived instead of filling the buffer
+                block = response.read1(PROXY_BLOCK_BYTES)
+                if not block:
+                    break
+                if chunked:
+                    self.wfile.write(f"{len(block):x}\r\n".encode("ascii") + block + b"\r\n")
+                else:
+                    self.wfile.write(block)
+                self.wfile.flush()
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (OSError, http.client.HTTPException):
+            # The browser went away or the backend dropped the stream; neither end can be reused
+            self.close_connection = True
+
 
 def main():
-    os.chdir(FRONTEND_DIR)
-    
-    with socketserver.TCPServer(("", PORT), CustomHTTPRequestHandler) as httpd:
-        print(f"🚀 Frontend server running at http://localhost:{PORT}")
-        print(f"📁 Serving files from: {FRONTEND_DIR}")
+    parser = argparse.ArgumentParser(description="Serve the Career-Pilot AI frontend.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backend-url", default=BACKEND_URL,
+                        help="Backend that requests under /api/ are proxied to (default: %(default)s)")
+    parser.add_argument("--no-proxy", action="store_true",
+                        help="Do not proxy /api/; the UI then calls the backend directly (cross-origin)")
+    args = parser.parse_args()
+
+    backend_url = None if args.no_proxy else args.backend_url.rstrip("/")
+    assets = load_assets(FRONTEND_DIR, API_PREFIX if backend_url else None)
+    encodings = sorted({encoding for asset in assets.values() for encoding in asset.variants} - {"identity"})
+
+    with FrontendServer(("", args.port), assets, backend_url) as httpd:
+        print(f"🚀 Frontend server running at http://localhost:{args.port}")
+        print(f"📁 Serving {len(assets)} routes from: {FRONTEND_DIR} (precompressed: {', '.join(encodings) or 'none'})")
+        if backend_url:
+            print(f"🔀 Proxying {API_PREFIX}/ to {backend_url}")
         print("Press Ctrl+C to stop the server")
-        
+
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n👋 Server stopped")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()